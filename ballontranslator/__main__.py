@@ -11,6 +11,15 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--proj-dir", default='', type=str, help='Open project directory on startup')
     parser.add_argument("--qt-api", default='', choices=QT_APIS, help='Set qt api')
+    parser.add_argument("--headless", action='store_true', help='Run image translation pipeline on --proj-dir without GUI and exit')
+    parser.add_argument("--config", default='', type=str, help='Config file used in headless mode, default to data/config/config.json')
+    parser.add_argument("--disable-ocr", action='store_true', help='Headless mode: skip OCR and translation')
+    parser.add_argument("--disable-translate", action='store_true', help='Headless mode: skip translation')
+    parser.add_argument("--disable-inpaint", action='store_true', help='Headless mode: skip inpainting')
+    parser.add_argument("--pipeline-mode", default='', choices=['thread', 'process'], help='Headless mode: override the configured pipeline mode, "process" shards pages of cpu detection & inpainting across worker processes')
+    parser.add_argument("--resume", action='store_true', help='Headless mode: skip stages already finished with the same modules & params by a previous run')
+    parser.add_argument("--profile-dir", default='', type=str, help='Headless mode: save per page & stage wall/cpu time and rss growth of the run as json/csv here')
+    parser.add_argument("--workers", default=-1, type=int, help='Headless mode: number of worker processes in process mode, 0 for cpu count')
     args = parser.parse_args()
 
     if not args.qt_api in QT_APIS:
@@ -22,6 +31,9 @@ def main():
         os.environ['QT_API'] = 'pyqt6'
         LOGGER.info('running on macOS, set QT_API to pyqt6')
 
+    if args.headless:
+        sys.exit(0 if run_headless(args) else 1)
+
     if sys.platform == 'win32':
         import ctypes
         myappid = u'BalloonsTranslator' # arbitrary string
@@ -68,5 +80,47 @@ def main():
     ballontrans.resetStyleSheet()
     sys.exit(app.exec())
 
+def run_headless(args) -> bool:
+    if not args.proj_dir:
+        LOGGER.error('--proj-dir is required in headless mode')
+        return False
+    proj_dir = osp.abspath(args.proj_dir)
+    config_path = osp.abspath(args.config) if args.config else ''
+    profile_dir = osp.abspath(args.profile_dir) if args.profile_dir else ''
+
+    import json
+    from ui import constants as C
+    from ui.misc import ProgramConfig
+    os.chdir(C.PROGRAM_PATH)
+    setup_logging(C.LOGGING_PATH)
+
+    if not config_path:
+        config_path = C.CONFIG_PATH
+    if osp.exists(config_path):
+        with open(config_path, 'r', encoding='utf8') as f:
+            config = ProgramConfig(**json.loads(f.read()))
+    else:
+        LOGGER.warning(f'{config_path} not found, use default config')
+        config = ProgramConfig()
+
+    dl_config = config.dl
+    if args.disable_ocr:
+        dl_config.enable_ocr = False
+    if args.disable_ocr or args.disable_translate:
+        dl_config.enable_translate = False
+    if args.disable_inpaint:
+        dl_config.enable_inpaint = False
+    if args.pipeline_mode:
+        dl_config.pipeline_mode = args.pipeline_mode
+    if args.workers >= 0:
+        dl_config.num_workers = args.workers
+    if args.profile_dir:
+        dl_config.profile_dir = profile_dir
+
+    from ui.imgtrans_pipeline import run_headless as run_imgtrans_headless
+    return run_imgtrans_headless(proj_dir, dl_config, mask_dilate_ksize=config.drawpanel.recttool_dilate_ksize, resume=args.resume)
+
 if __name__ == '__main__':
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
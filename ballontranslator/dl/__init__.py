@@ -1,6 +1,6 @@
 from .ocr import OCR, OCRBase, OCRMIT32px, OCRMIT48pxCTC, MangaOCR
 from .textdetector import TEXTDETECTORS, TextDetectorBase, ComicTextDetector
-from .translators import TRANSLATORS, TranslatorBase, SugoiTranslator
+from .translators import TRANSLATORS, TranslatorBase, SugoiTranslator, HedgedTranslator
 from .inpaint import INPAINTERS, InpainterBase, PatchmatchInpainter, AOTInpainter, LamaInpainterMPE
 from .moduleparamparser import DEFAULT_DEVICE
 
@@ -1,24 +1,142 @@
 import numpy as np
 import cv2
-from typing import Dict, List
+from typing import Callable, Dict, List, Tuple
 
 from utils.registry import Registry
 from utils.textblock_mask import extract_ballon_mask
 from utils.imgproc_utils import enlarge_window
+from utils.logger import logger as LOGGER
 
 from ..moduleparamparser import ModuleParamParser, DEFAULT_DEVICE
 from ..textdetector import TextBlock
+from ..precision import autocast_context
 
 INPAINTERS = Registry('inpainters')
 register_inpainter = INPAINTERS.register_module
 
 
+def schedule_block_rounds(windows: List[List[int]]) -> List[List[int]]:
+    '''
+    Group block windows into rounds of non-overlapping windows which can be inpainted together,
+    a window overlapping earlier ones is scheduled after all of them, so overlapping crops still composite in order.
+    '''
+    rounds = []
+    round_of = []
+    for jj, (x1, y1, x2, y2) in enumerate(windows):
+        r = 0
+        for ii in range(jj):
+            wx1, wy1, wx2, wy2 = windows[ii]
+            if x1 < wx2 and wx1 < x2 and y1 < wy2 and wy1 < y2:
+                r = max(r, round_of[ii] + 1)
+        round_of.append(r)
+        if r == len(rounds):
+            rounds.append([])
+        rounds[r].append(jj)
+    return rounds
+
+
+def bucket_by_shape(shapes: List[Tuple[int, int]], max_batch_pixels: int) -> List[Tuple[Tuple[int, int], List[int]]]:
+    '''
+    indices of shapes grouped by equal shape into batches of at most max_batch_pixels pixels, None shapes are left out
+    '''
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    for ii, shape in enumerate(shapes):
+        if shape is not None:
+            buckets.setdefault(shape, []).append(ii)
+    batches = []
+    for shape, indices in buckets.items():
+        batch_size = max(1, max_batch_pixels // (shape[0] * shape[1]))
+        for jj in range(0, len(indices), batch_size):
+            batches.append((shape, indices[jj: jj + batch_size]))
+    return batches
+
+
+def ceil_to(x: int, stride: int) -> int:
+    return (x + stride - 1) // stride * stride
+
+
+def tile_starts(length: int, tile_size: int, overlap: int) -> List[int]:
+    '''
+    starts of tiles covering length, the last one is aligned to the end so all tiles have the same size
+    '''
+    if length <= tile_size:
+        return [0]
+    step = max(tile_size - overlap, 1)
+    return list(range(0, length - tile_size, step)) + [length - tile_size]
+
+
+def _edge_ramp(length: int, ramp_start: int, ramp_end: int) -> np.ndarray:
+    ramp = np.ones(length, dtype=np.float32)
+    if ramp_start > 0:
+        ramp[:ramp_start] = np.linspace(0, 1, ramp_start + 2, dtype=np.float32)[1:-1]
+    if ramp_end > 0:
+        ramp[-ramp_end:] = np.minimum(ramp[-ramp_end:], np.linspace(1, 0, ramp_end + 2, dtype=np.float32)[1:-1])
+    return ramp
+
+
+def feather_weights(tile_h: int, tile_w: int, ramp_top: int, ramp_bottom: int, ramp_left: int, ramp_right: int) -> np.ndarray:
+    '''
+    weights of a tile ramping up from its edges over the given widths, 0 keeps an edge at full weight
+    '''
+    weights = _edge_ramp(tile_h, ramp_top, ramp_bottom)[:, None] * _edge_ramp(tile_w, ramp_left, ramp_right)[None]
+    return weights[..., None]
+
+
+def plan_inpaint_rois(mask: np.ndarray, context: int = 64, merge_gap: int = 32) -> List[List[int]]:
+    '''
+    Boxes covering connected components of the mask with context around them,
+    components closer than merge_gap and boxes overlapping each other are merged, so the boxes don't overlap.
+    '''
+    im_h, im_w = mask.shape[:2]
+    binary = (mask >= 127).astype(np.uint8)
+    if merge_gap > 0:
+        binary = cv2.dilate(binary, cv2.getStructuringElement(cv2.MORPH_RECT, (2 * merge_gap + 1, 2 * merge_gap + 1)))
+    num_labels, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    boxes = []
+    for x, y, w, h, _ in stats[1:]:
+        # dilation already added merge_gap around the component
+        pad = max(context - merge_gap, int(0.25 * max(w, h)), 0)
+        boxes.append([max(x - pad, 0), max(y - pad, 0), min(x + w + pad, im_w), min(y + h + pad, im_h)])
+
+    merged = True
+    while merged:
+        merged = False
+        for ii in range(len(boxes)):
+            for jj in range(ii + 1, len(boxes)):
+                a, b = boxes[ii], boxes[jj]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[ii] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    boxes.pop(jj)
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
 class InpainterBase(ModuleParamParser):
 
     inpaint_by_block = True
     check_need_inpaint = True
+    # pages larger than inpaint_size are inpainted in overlapping tiles at native resolution instead of being downscaled,
+    # tile_size 0 or inpaint_size 0 disables tiling
+    inpaint_size = 0
+    tile_size = 0
+    tile_overlap = 128
+    tile_memory_mb = 2048
+    bytes_per_pixel = 1024   # rough peak memory of a forward pass per input pixel
+    # full-page inpainting only processes clusters of the mask, see plan_inpaint_rois
+    inpaint_by_roi = False
+    roi_context = 64
+    roi_merge_gap = 32
+    roi_max_ratio = 0.6     # inpaint the whole page if clusters cover more of it
+    model = None
+    ort_model = None        # onnxruntime session replacing model, see ort.py
+    precision = 'fp32'      # 'bf16' runs the torch model under autocast
     def __init__(self, **setup_params) -> None:
         super().__init__(**setup_params)
+        self.num_page_pixels = 0
+        self.num_processed_pixels = 0
         self.name = ''
         for key in INPAINTERS.module_dict:
             if INPAINTERS.module_dict[key] == self.__class__:
@@ -29,7 +147,11 @@ class InpainterBase(ModuleParamParser):
     def setup_inpainter(self):
         raise NotImplementedError
 
-    def inpaint(self, img: np.ndarray, mask: np.ndarray, textblock_list: List[TextBlock] = None, check_need_inpaint: bool = False) -> np.ndarray:
+    def inpaint(self, img: np.ndarray, mask: np.ndarray, textblock_list: List[TextBlock] = None, check_need_inpaint: bool = False, cancel_token = None) -> np.ndarray:
+        '''
+        cancel_token: utils.pipeline.CancelToken checked between blocks
+        '''
+        self.num_page_pixels += img.shape[0] * img.shape[1]
         if not self.inpaint_by_block or textblock_list is None:
             if check_need_inpaint:
                 ballon_msk, non_text_msk = extract_ballon_mask(img, mask)
@@ -44,42 +166,187 @@ class InpainterBase(ModuleParamParser):
                         img = img.copy()
                         img[np.where(ballon_msk > 0)] = average_bg_color
                         return img
-            return self._inpaint(img, mask)
+            if self.inpaint_by_roi:
+                return self._inpaint_roi(img, mask, cancel_token=cancel_token)
+            return self._inpaint_page(img, mask, cancel_token=cancel_token)
         else:
             im_h, im_w = img.shape[:2]
             inpainted = np.copy(img)
-            for blk in textblock_list:
-                xyxy = blk.xyxy
-                xyxy_e = enlarge_window(xyxy, im_w, im_h, ratio=1.7)
-                im = inpainted[xyxy_e[1]:xyxy_e[3], xyxy_e[0]:xyxy_e[2]]
-                msk = mask[xyxy_e[1]:xyxy_e[3], xyxy_e[0]:xyxy_e[2]]
-                need_inpaint = True
-                if self.check_need_inpaint or check_need_inpaint:
-                    ballon_msk, non_text_msk = extract_ballon_mask(im, msk)
-                    if ballon_msk is not None:
-                        non_text_region = np.where(non_text_msk > 0)
-                        non_text_px = im[non_text_region]
-                        average_bg_color = np.mean(non_text_px, axis=0)
-                        std_bgr = np.std(non_text_px - average_bg_color, axis=0)
-                        std_max = np.max(std_bgr)
-                        inpaint_thresh = 7 if np.std(std_bgr) > 1 else 10
-                        if std_max < inpaint_thresh:
-                            need_inpaint = False
-                            im[np.where(ballon_msk > 0)] = average_bg_color
-                        # cv2.imshow('im', im)
-                        # cv2.imshow('ballon', ballon_msk)
-                        # cv2.imshow('non_text', non_text_msk)
-                        # cv2.waitKey(0)
-                
-                if need_inpaint:
-                    inpainted[xyxy_e[1]:xyxy_e[3], xyxy_e[0]:xyxy_e[2]] = self._inpaint(im, msk)
-
-                mask[xyxy[1]:xyxy[3], xyxy[0]:xyxy[2]] = 0
+            windows = [enlarge_window(blk.xyxy, im_w, im_h, ratio=1.7) for blk in textblock_list]
+            # crops of a round don't overlap and go through _inpaint_batch together
+            for round_indices in schedule_block_rounds(windows):
+                if cancel_token is not None:
+                    cancel_token.check()
+                todo = []
+                for ii in round_indices:
+                    xyxy_e = windows[ii]
+                    im = inpainted[xyxy_e[1]:xyxy_e[3], xyxy_e[0]:xyxy_e[2]]
+                    msk = mask[xyxy_e[1]:xyxy_e[3], xyxy_e[0]:xyxy_e[2]]
+                    if im.size == 0:
+                        continue
+                    need_inpaint = True
+                    if self.check_need_inpaint or check_need_inpaint:
+                        ballon_msk, non_text_msk = extract_ballon_mask(im, msk)
+                        if ballon_msk is not None:
+                            non_text_region = np.where(non_text_msk > 0)
+                            non_text_px = im[non_text_region]
+                            average_bg_color = np.mean(non_text_px, axis=0)
+                            std_bgr = np.std(non_text_px - average_bg_color, axis=0)
+                            std_max = np.max(std_bgr)
+                            inpaint_thresh = 7 if np.std(std_bgr) > 1 else 10
+                            if std_max < inpaint_thresh:
+                                need_inpaint = False
+                                im[np.where(ballon_msk > 0)] = average_bg_color
+                            # cv2.imshow('im', im)
+                            # cv2.imshow('ballon', ballon_msk)
+                            # cv2.imshow('non_text', non_text_msk)
+                            # cv2.waitKey(0)
+                    if need_inpaint:
+                        todo.append(ii)
+
+                crops = [windows[ii] for ii in todo]
+                self.num_processed_pixels += sum([(y2 - y1) * (x2 - x1) for x1, y1, x2, y2 in crops])
+                inpainted_crops = self._inpaint_batch([inpainted[y1:y2, x1:x2] for x1, y1, x2, y2 in crops], 
+                                                      [mask[y1:y2, x1:x2] for x1, y1, x2, y2 in crops])
+                for (x1, y1, x2, y2), inpainted_crop in zip(crops, inpainted_crops):
+                    inpainted[y1:y2, x1:x2] = inpainted_crop
+
+                for ii in round_indices:
+                    xyxy = textblock_list[ii].xyxy
+                    mask[xyxy[1]:xyxy[3], xyxy[0]:xyxy[2]] = 0
             return inpainted
 
     def _inpaint(self, img: np.ndarray, mask: np.ndarray, textblock_list: List[TextBlock] = None) -> np.ndarray:
         raise NotImplementedError
 
+    def _inpaint_batch(self, img_list: List[np.ndarray], mask_list: List[np.ndarray], max_batch_pixels: int = None) -> List[np.ndarray]:
+        '''
+        inpaint crops of text blocks or tiles, inpainters running a network override it to batch forward passes
+        '''
+        return [self._inpaint(img, mask) for img, mask in zip(img_list, mask_list)]
+
+    def _inpaint_page(self, img: np.ndarray, mask: np.ndarray, cancel_token = None) -> np.ndarray:
+        if self.tile_size > 0 and self.inpaint_size > 0 and max(img.shape[:2]) > self.inpaint_size:
+            return self._inpaint_tiled(img, mask, cancel_token=cancel_token)
+        self.num_processed_pixels += img.shape[0] * img.shape[1]
+        return self._inpaint(img, mask)
+
+    def _inpaint_roi(self, img: np.ndarray, mask: np.ndarray, cancel_token = None) -> np.ndarray:
+        '''
+        inpaint padded clusters of the mask instead of the whole page, results are pasted into a copy of the page
+        '''
+        im_h, im_w = img.shape[:2]
+        rois = plan_inpaint_rois(mask, self.roi_context, self.roi_merge_gap)
+        if sum([(y2 - y1) * (x2 - x1) for x1, y1, x2, y2 in rois]) > self.roi_max_ratio * im_h * im_w:
+            return self._inpaint_page(img, mask, cancel_token=cancel_token)
+
+        inpainted = np.copy(img)
+        # clusters larger than inpaint_size would be downscaled, they go through _inpaint_page on their own
+        large = [roi for roi in rois if self.inpaint_size > 0 and max(roi[2] - roi[0], roi[3] - roi[1]) > self.inpaint_size]
+        small = [roi for roi in rois if roi not in large]
+        if small:
+            self.num_processed_pixels += sum([(y2 - y1) * (x2 - x1) for x1, y1, x2, y2 in small])
+            crops = self._inpaint_batch([img[y1:y2, x1:x2] for x1, y1, x2, y2 in small], [mask[y1:y2, x1:x2] for x1, y1, x2, y2 in small])
+            for (x1, y1, x2, y2), crop in zip(small, crops):
+                inpainted[y1:y2, x1:x2] = crop
+        for x1, y1, x2, y2 in large:
+            if cancel_token is not None:
+                cancel_token.check()
+            inpainted[y1:y2, x1:x2] = self._inpaint_page(img[y1:y2, x1:x2], mask[y1:y2, x1:x2], cancel_token=cancel_token)
+        return inpainted
+
+    def stats_summary(self) -> str:
+        '''
+        pixels run through the inpainting model versus pixels of the inpainted pages
+        '''
+        if self.num_page_pixels == 0:
+            return ''
+        ratio = self.num_processed_pixels / self.num_page_pixels * 100
+        return f'inpainting          {self.num_processed_pixels / 1e6:.1f}/{self.num_page_pixels / 1e6:.1f} MP processed ({ratio:.1f}%)'
+
+    def reset_stats(self):
+        self.num_page_pixels = self.num_processed_pixels = 0
+
+    def forward_model(self, *inputs):
+        if self.ort_model is not None:
+            return self.ort_model(*inputs)
+        if self.precision == 'bf16':
+            with autocast_context(self.precision, self.device):
+                return self.model(*inputs).float()
+        return self.model(*inputs)
+
+    def update_precision(self):
+        self.precision = self.setup_params['precision']['select'] if 'precision' in self.setup_params else 'fp32'
+
+    def load_backend(self, ckpt_path: str, export_func: Callable):
+        '''
+        'onnxruntime' exports ckpt_path on first use and runs the graph with intra_threads threads, 0 is onnxruntime's default
+        '''
+        backend = self.setup_params['backend']['select'] if 'backend' in self.setup_params else 'torch'
+        self.ort_model = None
+        if backend != 'onnxruntime':
+            return
+        try:
+            num_threads = int(self.setup_params['intra_threads'])
+        except (KeyError, ValueError):
+            num_threads = 0
+        try:
+            self.ort_model = load_ort_model(ckpt_path, export_func, self.model, self.device, num_threads)
+        except Exception as e:
+            LOGGER.error(f'failed to load onnxruntime backend of {ckpt_path}, falling back to torch: {repr(e)}')
+            self.setup_params['backend']['select'] = 'torch'
+        # exporting runs on cpu
+        self.model.to(self.device)
+
+    def update_tiling_params(self):
+        tile_size = self.setup_params['tile_size']['select'] if 'tile_size' in self.setup_params else 'off'
+        self.tile_size = 0 if tile_size == 'off' else int(tile_size)
+        try:
+            self.tile_memory_mb = float(self.setup_params['tile_memory_mb'])
+        except (KeyError, ValueError):
+            pass
+
+    def _inpaint_tiled(self, img: np.ndarray, mask: np.ndarray, cancel_token = None) -> np.ndarray:
+        '''
+        Only tiles intersecting the mask are inpainted, tiles are shrunk to fit tile_memory_mb.
+        Feathered tiles are accumulated in float canvases covering the inpainted tiles and normalized once, 
+        so every overlap, diagonal ones included, is a weighted average of the tiles covering it.
+        '''
+        max_batch_pixels = int(self.tile_memory_mb * 1024 ** 2 / self.bytes_per_pixel)
+        tile_size = min(self.tile_size, self.inpaint_size, max(int(max_batch_pixels ** 0.5) // 64 * 64, 256))
+        overlap = min(self.tile_overlap, tile_size // 4)
+        im_h, im_w = img.shape[:2]
+        tile_h, tile_w = min(tile_size, im_h), min(tile_size, im_w)
+        ys, xs = tile_starts(im_h, tile_size, overlap), tile_starts(im_w, tile_size, overlap)
+
+        # tiles of a row go through the network together
+        rows = [(y, [x for x in xs if np.any(mask[y: y + tile_h, x: x + tile_w])]) for y in ys]
+        rows = [(y, row) for y, row in rows if len(row) > 0]
+        inpainted = np.copy(img)
+        if len(rows) == 0:
+            return inpainted
+        y0, y1 = rows[0][0], rows[-1][0] + tile_h
+        x0, x1 = min([row[0] for _, row in rows]), max([row[-1] for _, row in rows]) + tile_w
+        acc = np.zeros((y1 - y0, x1 - x0, img.shape[2]), dtype=np.float32)
+        weight_sum = np.zeros((y1 - y0, x1 - x0, 1), dtype=np.float32)
+        for y, row in rows:
+            if cancel_token is not None:
+                cancel_token.check()
+            self.num_processed_pixels += len(row) * tile_h * tile_w
+            tiles = self._inpaint_batch([img[y: y + tile_h, x: x + tile_w] for x in row],
+                                        [mask[y: y + tile_h, x: x + tile_w] for x in row], max_batch_pixels=max_batch_pixels)
+            for x, tile in zip(row, tiles):
+                # page borders are left sharp, the other edges ramp across the overlap
+                weights = feather_weights(tile_h, tile_w, overlap if y > 0 else 0, overlap if y + tile_h < im_h else 0,
+                                          overlap if x > 0 else 0, overlap if x + tile_w < im_w else 0)
+                acc[y - y0: y - y0 + tile_h, x - x0: x - x0 + tile_w] += tile * weights
+                weight_sum[y - y0: y - y0 + tile_h, x - x0: x - x0 + tile_w] += weights
+
+        covered = weight_sum[..., 0] > 0
+        region = inpainted[y0: y1, x0: x1]
+        region[covered] = np.clip(np.round(acc[covered] / weight_sum[covered]), 0, 255).astype(np.uint8)
+        return inpainted
+
 
 @register_inpainter('opencv-tela')
 class OpenCVInpainter(InpainterBase):
@@ -117,6 +384,7 @@ class PatchmatchInpainter(InpainterBase):
 import torch
 from utils.imgproc_utils import resize_keepasp
 from .aot import AOTGenerator, load_aot_model
+from .ort import export_aot_onnx, export_lama_mpe_onnx, load_ort_model
 AOTMODEL: AOTGenerator = None
 AOTMODEL_PATH = 'data/models/aot_inpainter.ckpt'
 
@@ -142,11 +410,39 @@ class AOTInpainter(InpainterBase):
             ],
             'select': DEFAULT_DEVICE
         },
+        'tile_size': {
+            'type': 'selector',
+            'options': [
+                'off',
+                512,
+                1024
+            ],
+            'select': 1024
+        },
+        'tile_memory_mb': '2048',
+        'backend': {
+            'type': 'selector',
+            'options': [
+                'torch',
+                'onnxruntime'
+            ],
+            'select': 'torch'
+        },
+        'intra_threads': '0',
+        'precision': {
+            'type': 'selector',
+            'options': [
+                'fp32',
+                'bf16'
+            ],
+            'select': 'fp32'
+        },
         'description': 'manga-image-translator inpainter'
     }
 
     device = DEFAULT_DEVICE
     inpaint_size = 2048
+    max_batch_pixels = 2048 * 2048
     model: AOTGenerator = None
 
     def setup_inpainter(self):
@@ -158,9 +454,22 @@ class AOTInpainter(InpainterBase):
             self.model = AOTMODEL
             self.model.to(self.device)
         self.inpaint_by_block = True if self.device == 'cuda' else False
+        # the cpu path inpaints the whole page, only run clusters of the mask through the model
+        self.inpaint_by_roi = self.device == 'cpu'
         self.inpaint_size = int(self.setup_params['inpaint_size']['select'])
+        self.update_tiling_params()
+        self.update_precision()
+        self.load_backend(AOTMODEL_PATH, export_aot_onnx)
+
+    def batch_shape(self, im_h: int, im_w: int) -> Tuple[int, int]:
+        '''
+        padded input shape of a crop in a batch, None if the crop needs resizing and is inpainted on its own
+        '''
+        if max(im_h, im_w) > self.inpaint_size:
+            return None
+        return max(ceil_to(im_h, 64), 128), max(ceil_to(im_w, 64), 128)
 
-    def inpaint_preprocess(self, img: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    def inpaint_preprocess(self, img: np.ndarray, mask: np.ndarray, pad_to: Tuple[int, int] = None) -> np.ndarray:
 
         img_original = np.copy(img)
         mask_original = np.copy(mask)
@@ -174,8 +483,10 @@ class AOTInpainter(InpainterBase):
         mask = resize_keepasp(mask, new_shape, stride=None)
 
         im_h, im_w = img.shape[:2]
-        pad_bottom = 128 - im_h if im_h < 128 else 0
-        pad_right = 128 - im_w if im_w < 128 else 0
+        if pad_to is None:
+            pad_to = (max(im_h, 128), max(im_w, 128))
+        pad_bottom = pad_to[0] - im_h
+        pad_right = pad_to[1] - im_w
         mask = cv2.copyMakeBorder(mask, 0, pad_bottom, 0, pad_right, cv2.BORDER_REFLECT)
         img = cv2.copyMakeBorder(img, 0, pad_bottom, 0, pad_right, cv2.BORDER_REFLECT)
 
@@ -190,13 +501,9 @@ class AOTInpainter(InpainterBase):
         img_torch *= (1 - mask_torch)
         return img_torch, mask_torch, img_original, mask_original, pad_bottom, pad_right
 
-    @torch.no_grad()
-    def _inpaint(self, img: np.ndarray, mask: np.ndarray, textblock_list: List[TextBlock] = None) -> np.ndarray:
-
-        im_h, im_w = img.shape[:2]
-        img_torch, mask_torch, img_original, mask_original, pad_bottom, pad_right = self.inpaint_preprocess(img, mask)
-        img_inpainted_torch = self.model(img_torch, mask_torch)
-        img_inpainted = ((img_inpainted_torch.cpu().squeeze_(0).permute(1, 2, 0).numpy() + 1.0) * 127.5).astype(np.uint8)
+    def inpaint_postprocess(self, img_inpainted_torch: torch.Tensor, img_original: np.ndarray, mask_original: np.ndarray, pad_bottom: int, pad_right: int) -> np.ndarray:
+        im_h, im_w = img_original.shape[:2]
+        img_inpainted = ((img_inpainted_torch.cpu().permute(1, 2, 0).numpy() + 1.0) * 127.5).astype(np.uint8)
         if pad_bottom > 0:
             img_inpainted = img_inpainted[:-pad_bottom]
         if pad_right > 0:
@@ -208,6 +515,36 @@ class AOTInpainter(InpainterBase):
         
         return img_inpainted
 
+    @torch.no_grad()
+    def _inpaint(self, img: np.ndarray, mask: np.ndarray, textblock_list: List[TextBlock] = None) -> np.ndarray:
+
+        img_torch, mask_torch, img_original, mask_original, pad_bottom, pad_right = self.inpaint_preprocess(img, mask)
+        img_inpainted_torch = self.forward_model(img_torch, mask_torch)
+        return self.inpaint_postprocess(img_inpainted_torch[0], img_original, mask_original, pad_bottom, pad_right)
+
+    @torch.no_grad()
+    def _inpaint_batch(self, img_list: List[np.ndarray], mask_list: List[np.ndarray], max_batch_pixels: int = None) -> List[np.ndarray]:
+        '''
+        crops padded to the same shape go through the network as one batch
+        '''
+        rst = [None] * len(img_list)
+        shapes = [self.batch_shape(*img.shape[:2]) for img in img_list]
+        for ii, shape in enumerate(shapes):
+            if shape is None:
+                rst[ii] = self._inpaint(img_list[ii], mask_list[ii])
+        for shape, indices in bucket_by_shape(shapes, max_batch_pixels or self.max_batch_pixels):
+            if len(indices) == 1:
+                # a crop on its own keeps the single image padding
+                rst[indices[0]] = self._inpaint(img_list[indices[0]], mask_list[indices[0]])
+                continue
+            inputs = [self.inpaint_preprocess(img_list[ii], mask_list[ii], pad_to=shape) for ii in indices]
+            img_torch = torch.cat([inp[0] for inp in inputs])
+            mask_torch = torch.cat([inp[1] for inp in inputs])
+            img_inpainted_torch = self.forward_model(img_torch, mask_torch)
+            for ii, inp, inpainted_torch in zip(indices, inputs, img_inpainted_torch):
+                rst[ii] = self.inpaint_postprocess(inpainted_torch, *inp[2:])
+        return rst
+
     def updateParam(self, param_key: str, param_content):
         super().updateParam(param_key, param_content)
 
@@ -219,14 +556,25 @@ class AOTInpainter(InpainterBase):
                 self.inpaint_by_block = False
             else:
                 self.inpaint_by_block = True
+            self.inpaint_by_roi = param_device == 'cpu'
 
         elif param_key == 'inpaint_size':
             self.inpaint_size = int(self.setup_params['inpaint_size']['select'])
 
+        elif param_key in {'tile_size', 'tile_memory_mb'}:
+            self.update_tiling_params()
+
+        elif param_key in {'backend', 'intra_threads'}:
+            self.load_backend(AOTMODEL_PATH, export_aot_onnx)
+
+        elif param_key == 'precision':
+            self.update_precision()
+
 
 from .lama import LamaFourier, load_lama_mpe
 
 LAMA_MPE: LamaFourier = None
+LAMA_MPE_PATH = 'data/models/lama_mpe.ckpt'
 @register_inpainter('lama_mpe')
 class LamaInpainterMPE(InpainterBase):
 
@@ -247,25 +595,67 @@ class LamaInpainterMPE(InpainterBase):
                 'hip'
             ],
             'select': DEFAULT_DEVICE
+        },
+        'tile_size': {
+            'type': 'selector',
+            'options': [
+                'off',
+                512,
+                1024
+            ],
+            'select': 1024
+        },
+        'tile_memory_mb': '2048',
+        'backend': {
+            'type': 'selector',
+            'options': [
+                'torch',
+                'onnxruntime'
+            ],
+            'select': 'torch'
+        },
+        'intra_threads': '0',
+        'precision': {
+            'type': 'selector',
+            'options': [
+                'fp32',
+                'bf16'
+            ],
+            'select': 'fp32'
         }
     }
 
     device = DEFAULT_DEVICE
     inpaint_size = 2048
+    max_batch_pixels = 2048 * 2048
 
     def setup_inpainter(self):
         global LAMA_MPE
 
         self.device = self.setup_params['device']['select']
         if LAMA_MPE is None:
-            self.model = LAMA_MPE = load_lama_mpe(r'data/models/lama_mpe.ckpt', self.device)
+            self.model = LAMA_MPE = load_lama_mpe(LAMA_MPE_PATH, self.device)
         else:
             self.model = LAMA_MPE
             self.model.to(self.device)
         self.inpaint_by_block = True if self.device == 'cuda' else False
+        # the cpu path inpaints the whole page, only run clusters of the mask through the model
+        self.inpaint_by_roi = self.device == 'cpu'
         self.inpaint_size = int(self.setup_params['inpaint_size']['select'])
+        self.update_tiling_params()
+        self.update_precision()
+        self.load_backend(LAMA_MPE_PATH, export_lama_mpe_onnx)
+
+    def batch_shape(self, im_h: int, im_w: int) -> Tuple[int, int]:
+        '''
+        padded input shape of a crop in a batch, None if the crop needs resizing and is inpainted on its own
+        '''
+        if max(im_h, im_w) > self.inpaint_size:
+            return None
+        longer = max(ceil_to(im_h, 64), ceil_to(im_w, 64))
+        return longer, longer
 
-    def inpaint_preprocess(self, img: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    def inpaint_preprocess(self, img: np.ndarray, mask: np.ndarray, pad_to: Tuple[int, int] = None) -> np.ndarray:
 
         img_original = np.copy(img)
         mask_original = np.copy(mask)
@@ -279,9 +669,11 @@ class LamaInpainterMPE(InpainterBase):
         mask = resize_keepasp(mask, new_shape, stride=64)
 
         im_h, im_w = img.shape[:2]
-        longer = max(im_h, im_w)
-        pad_bottom = longer - im_h if im_h < longer else 0
-        pad_right = longer - im_w if im_w < longer else 0
+        if pad_to is None:
+            longer = max(im_h, im_w)
+            pad_to = (longer, longer)
+        pad_bottom = pad_to[0] - im_h
+        pad_right = pad_to[1] - im_w
         mask = cv2.copyMakeBorder(mask, 0, pad_bottom, 0, pad_right, cv2.BORDER_REFLECT)
         img = cv2.copyMakeBorder(img, 0, pad_bottom, 0, pad_right, cv2.BORDER_REFLECT)
 
@@ -301,14 +693,9 @@ class LamaInpainterMPE(InpainterBase):
         img_torch *= (1 - mask_torch)
         return img_torch, mask_torch, rel_pos, direct, img_original, mask_original, pad_bottom, pad_right
 
-    @torch.no_grad()
-    def _inpaint(self, img: np.ndarray, mask: np.ndarray, textblock_list: List[TextBlock] = None) -> np.ndarray:
-
-        im_h, im_w = img.shape[:2]
-        img_torch, mask_torch, rel_pos, direct, img_original, mask_original, pad_bottom, pad_right = self.inpaint_preprocess(img, mask)
-        img_inpainted_torch = self.model(img_torch, mask_torch, rel_pos, direct)
-        
-        img_inpainted = (img_inpainted_torch.cpu().squeeze_(0).permute(1, 2, 0).numpy() * 255).astype(np.uint8)
+    def inpaint_postprocess(self, img_inpainted_torch: torch.Tensor, img_original: np.ndarray, mask_original: np.ndarray, pad_bottom: int, pad_right: int) -> np.ndarray:
+        im_h, im_w = img_original.shape[:2]
+        img_inpainted = (img_inpainted_torch.cpu().permute(1, 2, 0).numpy() * 255).astype(np.uint8)
         if pad_bottom > 0:
             img_inpainted = img_inpainted[:-pad_bottom]
         if pad_right > 0:
@@ -320,6 +707,35 @@ class LamaInpainterMPE(InpainterBase):
         
         return img_inpainted
 
+    @torch.no_grad()
+    def _inpaint(self, img: np.ndarray, mask: np.ndarray, textblock_list: List[TextBlock] = None) -> np.ndarray:
+
+        img_torch, mask_torch, rel_pos, direct, img_original, mask_original, pad_bottom, pad_right = self.inpaint_preprocess(img, mask)
+        img_inpainted_torch = self.forward_model(img_torch, mask_torch, rel_pos, direct)
+        return self.inpaint_postprocess(img_inpainted_torch[0], img_original, mask_original, pad_bottom, pad_right)
+
+    @torch.no_grad()
+    def _inpaint_batch(self, img_list: List[np.ndarray], mask_list: List[np.ndarray], max_batch_pixels: int = None) -> List[np.ndarray]:
+        '''
+        crops padded to the same shape go through the network as one batch
+        '''
+        rst = [None] * len(img_list)
+        shapes = [self.batch_shape(*img.shape[:2]) for img in img_list]
+        for ii, shape in enumerate(shapes):
+            if shape is None:
+                rst[ii] = self._inpaint(img_list[ii], mask_list[ii])
+        for shape, indices in bucket_by_shape(shapes, max_batch_pixels or self.max_batch_pixels):
+            if len(indices) == 1:
+                # a crop on its own keeps the single image padding
+                rst[indices[0]] = self._inpaint(img_list[indices[0]], mask_list[indices[0]])
+                continue
+            inputs = [self.inpaint_preprocess(img_list[ii], mask_list[ii], pad_to=shape) for ii in indices]
+            img_torch, mask_torch, rel_pos, direct = [torch.cat([inp[jj] for inp in inputs]) for jj in range(4)]
+            img_inpainted_torch = self.forward_model(img_torch, mask_torch, rel_pos, direct)
+            for ii, inp, inpainted_torch in zip(indices, inputs, img_inpainted_torch):
+                rst[ii] = self.inpaint_postprocess(inpainted_torch, *inp[4:])
+        return rst
+
     def updateParam(self, param_key: str, param_content):
         super().updateParam(param_key, param_content)
 
@@ -331,10 +747,20 @@ class LamaInpainterMPE(InpainterBase):
                 self.inpaint_by_block = False
             else:
                 self.inpaint_by_block = True
+            self.inpaint_by_roi = param_device == 'cpu'
 
         elif param_key == 'inpaint_size':
             self.inpaint_size = int(self.setup_params['inpaint_size']['select'])
 
+        elif param_key in {'tile_size', 'tile_memory_mb'}:
+            self.update_tiling_params()
+
+        elif param_key in {'backend', 'intra_threads'}:
+            self.load_backend(LAMA_MPE_PATH, export_lama_mpe_onnx)
+
+        elif param_key == 'precision':
+            self.update_precision()
+
 
 # LAMA_ORI: LamaFourier = None
 # @register_inpainter('lama_ori')
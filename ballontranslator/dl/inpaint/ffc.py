@@ -79,8 +79,8 @@ class FourierUnit(nn.Module):
         r_size = x.size()
         # (batch, c, h, w/2+1, 2)
         fft_dim = (-3, -2, -1) if self.ffc3d else (-2, -1)
-        # x: torch.float16
-        if x.dtype == torch.float16:
+        # x: torch.float16 or torch.bfloat16, fft doesn't take either
+        if x.dtype in {torch.float16, torch.bfloat16}:
             half = True
             x = x.type(torch.float32)
         else:
@@ -104,7 +104,7 @@ class FourierUnit(nn.Module):
 
         ffted = ffted.view((batch, -1, 2,) + ffted.size()[2:]).permute(
             0, 1, 3, 4, 2).contiguous()  # (batch,c, t, h, w/2+1, 2)
-        if ffted.dtype == torch.float16:
+        if ffted.dtype in {torch.float16, torch.bfloat16}:
             ffted = ffted.type(torch.float32)
         ffted = torch.complex(ffted[..., 0], ffted[..., 1])
 
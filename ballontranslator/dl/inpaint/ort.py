@@ -0,0 +1,125 @@
+import os
+import inspect
+import os.path as osp
+from typing import Dict, List
+
+import torch
+import torch.nn as nn
+
+from utils.logger import logger as LOGGER
+from .lama import LamaFourier
+
+# DFT of lama's fourier units, torch's dynamo exporter targets 18 natively
+OPSET_VERSION = 18
+
+
+class LamaMPEGraph(nn.Module):
+    '''
+    LamaFourier in inference mode as a single module so it can be traced
+    '''
+
+    def __init__(self, model: LamaFourier) -> None:
+        super().__init__()
+        self.generator = model.generator
+        self.mpe = model.mpe
+
+    def forward(self, img, mask, rel_pos, direct):
+        rel_pos, direct = self.mpe(rel_pos, direct)
+        predicted_img = self.generator(img, mask, rel_pos, direct)
+        return predicted_img * mask + (1 - mask) * img
+
+
+NCHW_AXES = {0: 'batch', 2: 'height', 3: 'width'}
+NHW_AXES = {0: 'batch', 1: 'height', 2: 'width'}
+
+
+def export_onnx(model: nn.Module, example_inputs: List[torch.Tensor], input_axes: Dict[str, Dict], onnx_path: str):
+    '''
+    export model with the dynamic batch size & spatial dims given per input in input_axes
+    '''
+    dynamic_axes = dict(input_axes)
+    dynamic_axes['output'] = NCHW_AXES
+    kwargs = {}
+    # keep weights inside the graph file with the dynamo exporter of newer torch
+    if 'external_data' in inspect.signature(torch.onnx.export).parameters:
+        kwargs['external_data'] = False
+    if osp.dirname(onnx_path):
+        os.makedirs(osp.dirname(onnx_path), exist_ok=True)
+    tmp_path = onnx_path + '.tmp'
+    try:
+        with torch.no_grad():
+            torch.onnx.export(model, tuple(example_inputs), tmp_path, input_names=list(input_axes), output_names=['output'],
+                              dynamic_axes=dynamic_axes, opset_version=OPSET_VERSION, do_constant_folding=True, **kwargs)
+        os.replace(tmp_path, onnx_path)
+    finally:
+        if osp.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def export_aot_onnx(model: nn.Module, onnx_path: str):
+    model = model.cpu().eval()
+    img = torch.rand(1, 3, 256, 256) * 2 - 1
+    mask = (torch.rand(1, 1, 256, 256) > 0.5).float()
+    export_onnx(model, [img, mask], {'img': NCHW_AXES, 'mask': NCHW_AXES}, onnx_path)
+
+
+def export_lama_mpe_onnx(model: LamaFourier, onnx_path: str):
+    model.to('cpu')
+    model.eval()
+    mask = torch.zeros(1, 1, 256, 256)
+    mask[..., 64: 192, 64: 192] = 1
+    rel_pos, _, direct = model.load_masked_position_encoding(mask[0][0].numpy())
+    rel_pos = torch.LongTensor(rel_pos).unsqueeze_(0)
+    direct = torch.LongTensor(direct).unsqueeze_(0)
+    img = torch.rand(1, 3, 256, 256)
+    # rel_pos is (N, H, W), direct (N, H, W, 4)
+    input_axes = {'img': NCHW_AXES, 'mask': NCHW_AXES, 'rel_pos': NHW_AXES, 'direct': NHW_AXES}
+    export_onnx(LamaMPEGraph(model).eval(), [img, mask, rel_pos, direct], input_axes, onnx_path)
+
+
+def onnx_path_of(ckpt_path: str) -> str:
+    return osp.splitext(ckpt_path)[0] + '.onnx'
+
+
+def onnx_outdated(onnx_path: str, ckpt_path: str) -> bool:
+    if not osp.exists(onnx_path):
+        return True
+    return osp.exists(ckpt_path) and osp.getmtime(ckpt_path) > osp.getmtime(onnx_path)
+
+
+class ORTInpaintModel:
+    '''
+    Exported inpainting graph run by onnxruntime,
+    takes & returns torch tensors like the torch models so pre/postprocessing are shared.
+    '''
+
+    def __init__(self, onnx_path: str, device: str = 'cpu', num_threads: int = 0) -> None:
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        providers = ['CPUExecutionProvider']
+        if device == 'cuda' and 'CUDAExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'CUDAExecutionProvider')
+        self.onnx_path = onnx_path
+        self.num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=providers)
+        self.input_names = [inp.name for inp in self.session.get_inputs()]
+        LOGGER.info(f'onnxruntime session of {onnx_path} on {self.session.get_providers()[0]}')
+
+    def __call__(self, *inputs: torch.Tensor) -> torch.Tensor:
+        feeds = {name: tensor.detach().cpu().numpy() for name, tensor in zip(self.input_names, inputs)}
+        return torch.from_numpy(self.session.run(None, feeds)[0])
+
+
+def load_ort_model(ckpt_path: str, export_func, torch_model, device: str = 'cpu', num_threads: int = 0) -> ORTInpaintModel:
+    '''
+    export ckpt_path next to it on first use or when the checkpoint is newer than the export
+    '''
+    onnx_path = onnx_path_of(ckpt_path)
+    if onnx_outdated(onnx_path, ckpt_path):
+        LOGGER.info(f'exporting {ckpt_path} to {onnx_path}')
+        export_func(torch_model, onnx_path)
+    return ORTInpaintModel(onnx_path, device, num_threads)
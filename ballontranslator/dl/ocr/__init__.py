@@ -66,8 +66,8 @@ from .model_32px import OCR32pxModel
 OCR32PXMODEL: OCR32pxModel = None
 OCR32PXMODEL_PATH = r'data/models/mit32px_ocr.ckpt'
 
-def load_32px_model(model_path, device, chunk_size=16) -> OCR32pxModel:
-    model = OCR32pxModel(model_path, device, max_chunk_size=chunk_size)
+def load_32px_model(model_path, device, chunk_size=16, precision='fp32') -> OCR32pxModel:
+    model = OCR32pxModel(model_path, device, max_chunk_size=chunk_size, precision=precision)
     return model
 
 @register_OCR('mit32px')
@@ -92,23 +92,36 @@ class OCRMIT32px(OCRBase):
             ],
             'select': DEFAULT_DEVICE
         },
+        'precision': {
+            'type': 'selector',
+            'options': [
+                'fp32',
+                'dynamic-int8',
+                'bf16'
+            ],
+            'select': 'fp32'
+        },
         'description': 'OCRMIT32px'
     }
     device = DEFAULT_DEVICE
     chunk_size = 16
+    precision = 'fp32'
 
     def setup_ocr(self):
         
         global OCR32PXMODEL
         self.device = self.setup_params['device']['select']
         self.chunk_size = int(self.setup_params['chunk_size']['select'])
-        if OCR32PXMODEL is None:
+        self.precision = self.setup_params['precision']['select'] if 'precision' in self.setup_params else 'fp32'
+        if OCR32PXMODEL is None or OCR32PXMODEL.precision != self.precision:
             self.model = OCR32PXMODEL = \
-                load_32px_model(OCR32PXMODEL_PATH, self.device, self.chunk_size)
+                load_32px_model(OCR32PXMODEL_PATH, self.device, self.chunk_size, self.precision)
         else:
             self.model = OCR32PXMODEL
             self.model.to(self.device)
             self.model.max_chunk_size = self.chunk_size
+        # dynamic-int8 models stay on cpu
+        self.device = self.model.device
 
     def ocr_img(self, img: np.ndarray) -> str:
         return self.model.ocr_img(img)
@@ -118,10 +131,15 @@ class OCRMIT32px(OCRBase):
 
     def updateParam(self, param_key: str, param_content):
         super().updateParam(param_key, param_content)
+        if param_key == 'precision':
+            # the model is quantized at load time
+            self.setup_ocr()
+            return
         device = self.setup_params['device']['select']
         chunk_size = int(self.setup_params['chunk_size']['select'])
         if self.device != device:
             self.model.to(device)
+            self.device = self.model.device
         self.chunk_size = chunk_size
         self.model.max_chunk_size = chunk_size
 
@@ -186,8 +204,8 @@ from .mit48px_ctc import OCR48pxCTC
 OCR48PXMODEL: OCR48pxCTC = None
 OCR48PXMODEL_PATH = r'data/models/mit48pxctc_ocr.ckpt'
 
-def load_48px_model(model_path, device, chunk_size=16) -> OCR48pxCTC:
-    model = OCR48pxCTC(model_path, device, max_chunk_size=chunk_size)
+def load_48px_model(model_path, device, chunk_size=16, precision='fp32') -> OCR48pxCTC:
+    model = OCR48pxCTC(model_path, device, max_chunk_size=chunk_size, precision=precision)
     return model
 
 @register_OCR('mit48px_ctc')
@@ -212,23 +230,36 @@ class OCRMIT48pxCTC(OCRBase):
             ],
             'select': DEFAULT_DEVICE
         },
+        'precision': {
+            'type': 'selector',
+            'options': [
+                'fp32',
+                'dynamic-int8',
+                'bf16'
+            ],
+            'select': 'fp32'
+        },
         'description': 'mit48px_ctc'
     }
     device = DEFAULT_DEVICE
     chunk_size = 16
+    precision = 'fp32'
 
     def setup_ocr(self):
         
         global OCR48PXMODEL
         self.device = self.setup_params['device']['select']
         self.chunk_size = int(self.setup_params['chunk_size']['select'])
-        if OCR48PXMODEL is None:
+        self.precision = self.setup_params['precision']['select'] if 'precision' in self.setup_params else 'fp32'
+        if OCR48PXMODEL is None or OCR48PXMODEL.precision != self.precision:
             self.model = OCR48PXMODEL = \
-                load_48px_model(OCR48PXMODEL_PATH, self.device, self.chunk_size)
+                load_48px_model(OCR48PXMODEL_PATH, self.device, self.chunk_size, self.precision)
         else:
             self.model = OCR48PXMODEL
             self.model.to(self.device)
             self.model.max_chunk_size = self.chunk_size
+        # dynamic-int8 models stay on cpu
+        self.device = self.model.device
 
     def ocr_img(self, img: np.ndarray) -> str:
         return self.model.ocr_img(img)
@@ -238,10 +269,15 @@ class OCRMIT48pxCTC(OCRBase):
 
     def updateParam(self, param_key: str, param_content):
         super().updateParam(param_key, param_content)
+        if param_key == 'precision':
+            # the model is quantized at load time
+            self.setup_ocr()
+            return
         device = self.setup_params['device']['select']
         chunk_size = int(self.setup_params['chunk_size']['select'])
         if self.device != device:
             self.model.to(device)
+            self.device = self.model.device
         self.chunk_size = chunk_size
         self.model.max_chunk_size = chunk_size
     
@@ -11,6 +11,7 @@ import einops
 from typing import List, Tuple, Optional
 
 from ..textdetector.textblock import TextBlock
+from ..precision import quantize_dynamic_int8, autocast_context
 
 
 class PositionalEncoding(nn.Module):
@@ -392,7 +393,7 @@ class AvgMeter() :
 
 class OCR48pxCTC:
 
-    def __init__(self, model_path: str, device='cpu', max_chunk_size=16):
+    def __init__(self, model_path: str, device='cpu', max_chunk_size=16, precision='fp32'):
         with open('data/alphabet-all-v5.txt', 'r', encoding = 'utf-8') as fp :
             dictionary = [s[:-1] for s in fp.readlines()]
         self.device = device
@@ -405,11 +406,18 @@ class OCR48pxCTC:
         del sd['encoders.layers.2.pe.pe']
         model.load_state_dict(sd['model'] if 'model' in sd else sd, strict=False)
         model.eval()
+        self.precision = precision
+        if precision == 'dynamic-int8':
+            # quantized linear layers only run on cpu
+            self.device = 'cpu'
+            model = quantize_dynamic_int8(model, model_path)
         if self.device != 'cpu' :
             model = model.to(self.device)
         self.net = model
 
     def to(self, device: str) -> None:
+        if self.precision == 'dynamic-int8':
+            return
         self.net.to(device)
         self.device = device
 
@@ -441,7 +449,7 @@ class OCR48pxCTC:
             images = einops.rearrange(images, 'N H W C -> N C H W')
             if self.device != 'cpu':
                 images = images.to(self.device)
-            with torch.inference_mode() :
+            with torch.inference_mode(), autocast_context(self.precision, self.device) :
                 texts = self.net.decode(images, widths, 0)
             for i, single_line in enumerate(texts) :
                 if not single_line :
@@ -12,6 +12,7 @@ import numpy as np
 from typing import List, Tuple, Optional
 
 from ..textdetector.textblock import TextBlock
+from ..precision import quantize_dynamic_int8, autocast_context
 
 class ResNet(nn.Module):
 
@@ -541,7 +542,7 @@ def chunks(lst, n):
 
 
 class OCR32pxModel:
-    def __init__(self, model_path, device='cpu', max_chunk_size=16) -> None:
+    def __init__(self, model_path, device='cpu', max_chunk_size=16, precision='fp32') -> None:
         self.device = device
         self.max_chunk_size = max_chunk_size
         self.text_height = 32
@@ -553,11 +554,18 @@ class OCR32pxModel:
         sd = torch.load(model_path, map_location = 'cpu')
         model.load_state_dict(sd['model'] if 'model' in sd else sd)
         model.eval()
+        self.precision = precision
+        if precision == 'dynamic-int8':
+            # quantized linear layers only run on cpu
+            self.device = device = 'cpu'
+            model = quantize_dynamic_int8(model, model_path)
         if device != 'cpu':
             model = model.to(device)
         self.net = model
 
     def to(self, device: str) -> None:
+        if self.precision == 'dynamic-int8':
+            return
         self.net.to(device)
         self.device = device
 
@@ -589,7 +597,8 @@ class OCR32pxModel:
             images = einops.rearrange(images, 'N H W C -> N C H W')
             if self.device != 'cpu':
                 images = images.to(self.device)
-            ret = self.net.infer_beam_batch(images, widths, beams_k = 5, max_seq_length = 255)
+            with autocast_context(self.precision, self.device):
+                ret = self.net.infer_beam_batch(images, widths, beams_k = 5, max_seq_length = 255)
             
             for i, (pred_chars_index, prob, fr, fg, fb, br, bg, bb) in enumerate(ret) :
                 textblk = textblk_lst[textblk_lst_indices[i+chunck_idx]]
@@ -632,7 +641,8 @@ class OCR32pxModel:
         img = einops.rearrange(img, 'N H W C -> N C H W')
         if self.device != 'cpu':
             images = images.to(self.device)
-        ret = self.net.infer_beam_batch(img, widths, beams_k = 5, max_seq_length = 255)
+        with autocast_context(self.precision, self.device):
+            ret = self.net.infer_beam_batch(img, widths, beams_k = 5, max_seq_length = 255)
         for i, (pred_chars_index, prob, fr, fg, fb, br, bg, bb) in enumerate(ret) :
             if prob < 0.5 :
                 continue
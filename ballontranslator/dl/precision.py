@@ -0,0 +1,59 @@
+import os
+import os.path as osp
+import copy
+import contextlib
+
+import torch
+import torch.nn as nn
+
+
+def int8_cache_path(ckpt_path: str) -> str:
+    return osp.splitext(ckpt_path)[0] + '.int8.pt'
+
+
+def _swap_dynamic_linear(module: nn.Module):
+    '''
+    replace nn.Linear with empty dynamically quantized ones, the layout quantize_dynamic produces
+    '''
+    for name, child in module.named_children():
+        # subclasses like attention's NonDynamicallyQuantizableLinear are skipped by quantize_dynamic as well
+        if type(child) is nn.Linear:
+            setattr(module, name, torch.ao.nn.quantized.dynamic.Linear(child.in_features, child.out_features,
+                                                                       bias_=child.bias is not None, dtype=torch.qint8))
+        else:
+            _swap_dynamic_linear(child)
+
+
+def quantize_dynamic_int8(model: nn.Module, ckpt_path: str = None) -> nn.Module:
+    '''
+    Quantize linear layers of a cpu model to int8,
+    the quantized state dict is cached next to ckpt_path and reused while it's newer than the checkpoint.
+    '''
+    model = model.cpu().eval()
+    cache_path = int8_cache_path(ckpt_path) if ckpt_path is not None else None
+    if cache_path is not None and osp.exists(cache_path) and \
+            (not osp.exists(ckpt_path) or osp.getmtime(cache_path) >= osp.getmtime(ckpt_path)):
+        # swap a copy so a failed load leaves the fp32 layers to quantize
+        cached = copy.deepcopy(model)
+        try:
+            _swap_dynamic_linear(cached)
+            cached.load_state_dict(torch.load(cache_path, map_location='cpu', weights_only=False))
+            return cached
+        except Exception:
+            # stale cache from another torch version, quantize again
+            pass
+    model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    if cache_path is not None:
+        tmp_path = cache_path + '.tmp'
+        torch.save(model.state_dict(), tmp_path)
+        os.replace(tmp_path, cache_path)
+    return model
+
+
+def autocast_context(precision: str, device: str = 'cpu'):
+    '''
+    bf16 autocast for the forward passes of a model, a no-op for other precisions
+    '''
+    if precision != 'bf16':
+        return contextlib.nullcontext()
+    return torch.autocast('cuda' if device in {'cuda', 'hip'} else 'cpu', dtype=torch.bfloat16)
@@ -30,6 +30,7 @@ class TextBlock(object):
                  sort_weight: float = -1,
                  text: List = None,
                  translation: str = "",
+                 translation_fingerprint: str = "",
                  fg_r = 0,
                  fg_g = 0,
                  fg_b = 0,
@@ -72,6 +73,7 @@ class TextBlock(object):
         self.prob = 1
 
         self.translation = translation
+        self.translation_fingerprint = translation_fingerprint  # source text & translator the translation came from
 
         # note they're accumulative rgb values of textlines
         self.fg_r = fg_r                       
@@ -1,20 +1,29 @@
-import urllib.request
 from urllib3.exceptions import ConnectTimeoutError
 from ordered_set import OrderedSet
-from typing import Dict, List, Union, Set, Callable
-import time, requests, re, uuid, base64, hmac, functools, json, deepl
+from typing import Dict, List, Union, Set, Callable, Tuple
+import time, requests, re, uuid, base64, hmac, functools, json, deepl, threading, copy
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 import ctranslate2, sentencepiece as spm
-from .exceptions import InvalidSourceOrTargetLanguage, TranslatorSetupFailure, MissingTranslatorParams, TranslatorNotValid
+from .exceptions import InvalidSourceOrTargetLanguage, TranslatorSetupFailure, MissingTranslatorParams, TranslatorNotValid, TooManyRequests, ServerException
 from ..textdetector.textblock import TextBlock
 from ..moduleparamparser import ModuleParamParser
 from utils.registry import Registry
 from utils.io_utils import text_is_empty
+from utils.logger import logger as LOGGER
+from utils.ratelimit import RateLimiter, AIMDController, backoff_delay, parse_retry_after
+from utils.profiler import LatencyHistogram
 from .hooks import chs2cht
+from .cache import TranslationCache, open_translation_cache, normalize_text
+from .transport import TRANSPORT, BOOTSTRAP_CACHE, PROXY, HTTPTransport
 import random
 import hashlib
 TRANSLATORS = Registry('translators')
+# setup params of the rate limiter, see TranslatorBase.rate_limiter
+RATELIMIT_PARAMS = {'requests_per_sec', 'chars_per_sec', 'max_retries', 'delay'}
+# setup params which don't change translations, left out of translation cache keys
+CACHE_IGNORED_PARAMS = RATELIMIT_PARAMS | {'concurrency', 'device', 'token', 'api_key', 'appId', 'inter_threads', 'intra_threads', 'max_batch_size',
+                                           'latency_budget'}
 register_translator = TRANSLATORS.register_module
-PROXY = urllib.request.getproxies()
 LANGMAP_GLOBAL = {
     'Auto': '',
     '简体中文': '',
@@ -65,7 +74,10 @@ class TranslatorBase(ModuleParamParser):
 
     concate_text = True
     cht_require_convert = False
-    
+    # limits of a single request when text blocks of several pages are translated together, 0 means unlimited,
+    # pages are translated one request each if both are 0
+    max_batch_chars = 0
+    max_batch_segments = 0
     
     def __init__(self,
                  lang_source: str, 
@@ -83,6 +95,14 @@ class TranslatorBase(ModuleParamParser):
         self.lang_target: str = lang_target
         self.lang_map: Dict = LANGMAP_GLOBAL.copy()
         self.postprocess_hooks = OrderedSet()
+        self._rate_limiter: RateLimiter = None
+        self._concurrency_controller: AIMDController = None
+        self.cancel_token = None    # set by pipelines so retries & rate limiting stop waiting once cancelled
+        self.cache: TranslationCache = None
+        self.bypass_cache = False   # skip cache lookups but still store fresh translations
+        self.dedup_memo: Dict[str, str] = None  # normalized source text -> translation, shared by the pages of a run
+        self.num_source_chars = 0
+        self.num_dedup_chars = 0
         
         try:
             self.setup_translator()
@@ -138,10 +158,73 @@ class TranslatorBase(ModuleParamParser):
         if text_is_empty(text):
             return text
 
+        if self.cache is not None:
+            text_trans = self._translate_cached(text)
+        else:
+            text_trans = self._translate_uncached(text)
+            
+        if isinstance(text, List):
+            assert len(text_trans) == len(text)
+            for ii, t in enumerate(text_trans):
+                for callback in self.postprocess_hooks:
+                    text_trans[ii] = callback(t)
+        else:
+            for callback in self.postprocess_hooks:
+                text_trans = callback(text_trans)
+
+        return text_trans
+
+    def _translate_uncached(self, text: Union[str, List]) -> Union[str, List]:
+        if isinstance(text, List):
+            chunks = self.split_request(text)
+            if len(chunks) > 1:
+                return self._translate_chunks(text, chunks)
+        return self._translate_request(text)
+
+    def split_request(self, text_list: List[str]) -> List[Tuple[int, int]]:
+        '''
+        Split text_list into (start, end) ranges which fit max_batch_chars & max_batch_segments,
+        texts are never split, one longer than max_batch_chars is sent on its own.
+        '''
+        if not self.batch_enabled():
+            return [(0, len(text_list))]
+        sep_len = len(self.textblk_break) if self.concate_text else 0
+        chunks = []
+        start, num_chars = 0, 0
+        for ii, text in enumerate(text_list):
+            text_chars = len(text) + (sep_len if ii > start else 0)
+            num_segments = ii - start + 1
+            if ii > start and ((self.max_batch_chars > 0 and num_chars + text_chars > self.max_batch_chars) or \
+                               (not self.concate_text and self.max_batch_segments > 0 and num_segments > self.max_batch_segments)):
+                chunks.append((start, ii))
+                start, num_chars = ii, len(text)
+            else:
+                num_chars += text_chars
+        chunks.append((start, len(text_list)))
+        return chunks
+
+    def _translate_chunks(self, text_list: List[str], chunks: List[Tuple[int, int]]) -> List[str]:
+        '''
+        send the requests of a long text list concurrently, the adaptive window limits requests in flight
+        '''
+        num_workers = min(self.concurrency(), len(chunks))
+        if num_workers <= 1:
+            results = [self._translate_request(text_list[start: end]) for start, end in chunks]
+        else:
+            with ThreadPoolExecutor(num_workers, thread_name_prefix=f'{self.name}_request') as executor:
+                futures = [executor.submit(self._translate_request, text_list[start: end]) for start, end in chunks]
+                results = [future.result() for future in futures]
+        translations = []
+        for (start, end), rst in zip(chunks, results):
+            assert len(rst) == end - start
+            translations += rst
+        return translations
+
+    def _translate_request(self, text: Union[str, List]) -> Union[str, List]:
         concate_text = isinstance(text, List) and self.concate_text
         text_source = self.textlist2text(text) if concate_text else text
         
-        text_trans = self._translate(text_source)
+        text_trans = self._request(text_source)
         
         if text_trans is None:
             if isinstance(text, List):
@@ -150,17 +233,156 @@ class TranslatorBase(ModuleParamParser):
                 text_trans = ''
         elif concate_text:
             text_trans = self.text2textlist(text_trans)
-            
-        if isinstance(text, List):
-            assert len(text_trans) == len(text)
-            for ii, t in enumerate(text_trans):
-                for callback in self.postprocess_hooks:
-                    text_trans[ii] = callback(t)
+        return text_trans
+
+    def _translate_cached(self, text: Union[str, List]) -> Union[str, List]:
+        '''
+        only texts missing from the translation cache are sent to the translator
+        '''
+        text_list = text if isinstance(text, List) else [text]
+        signature = self.cache_signature()
+        cached = {} if self.bypass_cache else self.cache.get_many(signature, text_list)
+        translations = [cached.get(ii, '') for ii in range(len(text_list))]
+        todo = [ii for ii, t in enumerate(text_list) if ii not in cached and not text_is_empty(t)]
+        if todo:
+            src_list = [text_list[ii] for ii in todo]
+            trans_list = self._translate_uncached(src_list if isinstance(text, List) else src_list[0])
+            if isinstance(trans_list, str):
+                trans_list = [trans_list]
+            assert len(trans_list) == len(src_list)
+            # empty results are usually failures, don't keep them
+            keep = [ii for ii, tr in enumerate(trans_list) if tr]
+            if keep:
+                self.cache.put_many(signature, [src_list[ii] for ii in keep], [trans_list[ii] for ii in keep])
+            for ii, tr in zip(todo, trans_list):
+                translations[ii] = tr
+        return translations if isinstance(text, List) else translations[0]
+
+    def cache_signature(self) -> str:
+        params = {}
+        if self.setup_params is not None:
+            for key, param in self.setup_params.items():
+                if key not in CACHE_IGNORED_PARAMS:
+                    params[key] = param['select'] if isinstance(param, dict) else param
+        name = self.name or self.__class__.__name__
+        return name + json.dumps(params, sort_keys=True, ensure_ascii=False) + self.lang_source + '->' + self.lang_target
+
+    def _request(self, text: Union[str, List]) -> Union[str, List]:
+        '''
+        _translate under the rate limiter & the adaptive concurrency window,
+        requests rejected for rate limiting or server errors are retried with exponential backoff & Retry-After.
+        '''
+        num_chars = len(text) if isinstance(text, str) else sum([len(t) for t in text])
+        max_retries = self.max_retries()
+        controller = self.concurrency_controller
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(num_chars, sleep=self._sleep)
+            controller.acquire(check=self.cancel_token.check if self.cancel_token is not None else None)
+            t0 = time.perf_counter()
+            try:
+                rst = self._translate(text)
+            except Exception as e:
+                retry_after = self.retry_after(e)
+                controller.release(time.perf_counter() - t0, congested=retry_after is not None, succeeded=False)
+                if retry_after is None or attempt >= max_retries:
+                    raise e
+                wait = max(retry_after, backoff_delay(attempt))
+                attempt += 1
+                LOGGER.warning(f'{self.name} request failed: {repr(e)}, retry {attempt}/{max_retries} in {wait:.1f}s')
+                # slow down every thread sharing this translator
+                self.rate_limiter.block(wait)
+                continue
+            controller.release(time.perf_counter() - t0, num_chars=num_chars)
+            return rst
+
+    @property
+    def concurrency_controller(self) -> AIMDController:
+        '''
+        requests in flight grow additively up to concurrency() while they succeed and are halved on 429/5xx/timeouts
+        '''
+        if self._concurrency_controller is None:
+            self._concurrency_controller = AIMDController(max_window=self.concurrency())
+        return self._concurrency_controller
+
+    def stats_summary(self) -> str:
+        '''
+        extra statistics for pipeline summaries
+        '''
+        lines = []
+        if self.num_source_chars > 0:
+            ratio = self.num_dedup_chars / self.num_source_chars * 100
+            lines.append(f'deduplication       {self.num_dedup_chars}/{self.num_source_chars} chars not sent ({ratio:.1f}%)')
+        if self._concurrency_controller is not None and self._concurrency_controller.max_window > 1:
+            lines.append(f'  {self.name:<12} {self._concurrency_controller.summary()}')
+        return '\n'.join(lines)
+
+    def reset_stats(self):
+        self.num_source_chars = self.num_dedup_chars = 0
+        if self.cache is not None:
+            self.cache.reset_stats()
+
+    def retry_after(self, e: Exception) -> float:
+        '''
+        seconds to wait before retrying a request failed with e, None if it shouldn't be retried
+        '''
+        if isinstance(e, (TooManyRequests, ServerException)):
+            return e.retry_after or 0.
+        if isinstance(e, (requests.ConnectionError, requests.Timeout, deepl.TooManyRequestsException)):
+            return 0.
+        return None
+
+    @property
+    def http(self) -> HTTPTransport:
+        '''
+        pooled keep-alive session with timeouts & proxy shared by online translators, use it instead of requests.get/post
+        '''
+        return TRANSPORT
+
+    def check_response(self, response: requests.Response):
+        '''
+        raise retryable exceptions on 429 & 5xx responses
+        '''
+        if response.status_code == 429:
+            raise TooManyRequests(f'{self.name}: too many requests', retry_after=parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code >= 500:
+            raise ServerException(response.status_code, retry_after=parse_retry_after(response.headers.get('Retry-After')))
+
+    def _sleep(self, seconds: float):
+        if self.cancel_token is not None:
+            self.cancel_token.sleep(seconds)
+            self.cancel_token.check()
         else:
-            for callback in self.postprocess_hooks:
-                text_trans = callback(text_trans)
+            time.sleep(seconds)
 
-        return text_trans
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        if self._rate_limiter is None:
+            requests_per_sec = self._float_param('requests_per_sec')
+            # legacy fixed delay between requests
+            delay = self.delay()
+            if delay > 0:
+                requests_per_sec = min(requests_per_sec, 1 / delay) if requests_per_sec > 0 else 1 / delay
+            self._rate_limiter = RateLimiter(requests_per_sec, self._float_param('chars_per_sec'))
+        return self._rate_limiter
+
+    def max_retries(self) -> int:
+        return int(self._float_param('max_retries'))
+
+    def _float_param(self, param_key: str) -> float:
+        if self.setup_params is not None and param_key in self.setup_params:
+            try:
+                return max(0., float(self.setup_params[param_key]))
+            except:
+                pass
+        return 0.
+
+    def updateParam(self, param_key: str, param_content):
+        super().updateParam(param_key, param_content)
+        if param_key in RATELIMIT_PARAMS:
+            self._rate_limiter = None
+        elif param_key == 'concurrency':
+            self._concurrency_controller = None
 
     def textlist2text(self, text_list: List[str]) -> str:
         # some translators automatically strip '\n'
@@ -172,13 +394,103 @@ class TranslatorBase(ModuleParamParser):
         text_list = text.split(breaker)
         return [text.lstrip().rstrip() for text in text_list]
 
-    def translate_textblk_lst(self, textblk_lst: List[TextBlock]):
+    def translate_deduplicated(self, text_list: List[str]) -> List[str]:
+        '''
+        Texts equal after normalization are translated once, so are texts already in dedup_memo.
+        Empty texts are left untranslated.
+        '''
+        keys = [normalize_text(text) for text in text_list]
+        memo = self.dedup_memo if self.dedup_memo is not None else {}
+        unique: Dict[str, str] = {}
+        for key, text in zip(keys, text_list):
+            if key and key not in memo and key not in unique:
+                unique[key] = text
+        translations = {}
+        if unique:
+            translations = dict(zip(unique.keys(), self.translate(list(unique.values()))))
+            # empty results are usually failures, don't reuse them
+            memo.update({key: tr for key, tr in translations.items() if tr})
+        self.num_source_chars += sum([len(text) for text in text_list])
+        self.num_dedup_chars += sum([len(text) for text in text_list]) - sum([len(text) for text in unique.values()])
+        return [translations[key] if key in translations else memo.get(key, '') for key in keys]
+
+    def textblk_fingerprint(self, blk: TextBlock, signature: str = None) -> str:
+        '''
+        changes with the source text of blk, the translator, its params & the language pair
+        '''
+        if signature is None:
+            signature = self.cache_signature()
+        return TranslationCache.make_key(signature, blk.get_text())
+
+    def translate_textblk_lst(self, textblk_lst: List[TextBlock], only_changed: bool = False):
+        '''
+        only_changed: skip blocks translated from the same source text before, 
+        so fixing a few OCR errors doesn't resend the page or overwrite edited translations
+        '''
+        signature = self.cache_signature()
+        fingerprints = [self.textblk_fingerprint(blk, signature) for blk in textblk_lst]
+        if only_changed:
+            changed = [ii for ii, blk in enumerate(textblk_lst) if not blk.translation or blk.translation_fingerprint != fingerprints[ii]]
+            textblk_lst = [textblk_lst[ii] for ii in changed]
+            fingerprints = [fingerprints[ii] for ii in changed]
+            if not textblk_lst:
+                return
         text_list = [blk.get_text() for blk in textblk_lst]
-        translations = self.translate(text_list)
-        for tr, blk in zip(translations, textblk_lst):
+        translations = self.translate_deduplicated(text_list)
+        # hooks run on every block, blocks sharing a translation can still end up different
+        for tr, blk, fingerprint in zip(translations, textblk_lst, fingerprints):
             for callback in self.postprocess_hooks:
                 tr = callback(tr, blk=blk)
             blk.translation = tr
+            blk.translation_fingerprint = fingerprint if tr else ''
+
+    def batch_enabled(self) -> bool:
+        return self.max_batch_chars > 0 or self.max_batch_segments > 0
+
+    def batch_size(self, textblk_lsts: List[List[TextBlock]]) -> Tuple[int, int]:
+        '''
+        number of characters and segments of the request translating these pages together
+        '''
+        # repeated texts are sent once, see translate_deduplicated
+        text_list = list({normalize_text(blk.get_text()) for blk_list in textblk_lsts for blk in blk_list} - {''})
+        num_chars = sum([len(text) for text in text_list])
+        if self.concate_text:
+            num_chars += len(self.textblk_break) * max(len(text_list) - 1, 0)
+            return num_chars, min(len(text_list), 1)
+        return num_chars, len(text_list)
+
+    def batch_fits(self, textblk_lsts: List[List[TextBlock]]) -> bool:
+        textblk_lsts = [blk_list for blk_list in textblk_lsts if blk_list]
+        if len(textblk_lsts) <= 1:
+            return True
+        if not self.batch_enabled():
+            return False
+        num_chars, num_segments = self.batch_size(textblk_lsts)
+        if self.max_batch_chars > 0 and num_chars > self.max_batch_chars:
+            return False
+        if self.max_batch_segments > 0 and num_segments > self.max_batch_segments:
+            return False
+        return True
+
+    def translate_textblk_lst_batch(self, textblk_lsts: List[List[TextBlock]], only_changed: bool = False):
+        '''
+        Translate text blocks of several pages with a single request, see batch_fits for the size limits.
+        Falls back to one request per page if the batched request failed, e.g. the translator dropped a textblk_break.
+        '''
+        textblk_lsts = [blk_list for blk_list in textblk_lsts if blk_list]
+        if len(textblk_lsts) == 1:
+            self.translate_textblk_lst(textblk_lsts[0], only_changed)
+            return
+        elif len(textblk_lsts) == 0:
+            return
+        try:
+            self.translate_textblk_lst([blk for blk_list in textblk_lsts for blk in blk_list], only_changed)
+        except MissingTranslatorParams as e:
+            raise e
+        except Exception as e:
+            LOGGER.warning(f'Batched translation of {len(textblk_lsts)} pages failed: {repr(e)}, translating them one by one')
+            for blk_list in textblk_lsts:
+                self.translate_textblk_lst(blk_list, only_changed)
 
     def supported_languages(self) -> List[str]:
         return self.valid_lang_list
@@ -198,7 +510,10 @@ class TranslatorBase(ModuleParamParser):
             return text
         
     def delay(self) -> float:
-        if 'delay' in self.setup_params:
+        '''
+        legacy fixed delay between requests, translators declare requests_per_sec instead
+        '''
+        if self.setup_params is not None and 'delay' in self.setup_params:
             delay = self.setup_params['delay']
             if delay:
                 try:
@@ -207,13 +522,29 @@ class TranslatorBase(ModuleParamParser):
                     pass
         return 0.
 
+    def concurrency(self) -> int:
+        '''
+        upper bound of requests in flight, the adaptive window in concurrency_controller settles below it,
+        translators that aren't thread-safe leave 'concurrency' out of setup_params
+        '''
+        if self.setup_params is not None and 'concurrency' in self.setup_params:
+            try:
+                return max(1, int(self.setup_params['concurrency']))
+            except:
+                pass
+        return 1
+
 
 @register_translator('google')
 class GoogleTranslator(TranslatorBase):
 
     concate_text = True
+    # text is sent url-encoded in a GET request, a CJK character takes 9 bytes
+    max_batch_chars = 1500
     setup_params: Dict = {
-        'delay': '0.0',
+        'requests_per_sec': '5',
+        'chars_per_sec': '0',
+        'max_retries': '3',
         'url': {
             'type': 'selector',
             'options': [
@@ -263,7 +594,13 @@ class GoogleTranslator(TranslatorBase):
 class PapagoTranslator(TranslatorBase):
 
     concate_text = True
-    setup_params: Dict = {'delay': '0.0'}
+    max_batch_chars = 4500
+    setup_params: Dict = {
+        'requests_per_sec': '2',
+        'chars_per_sec': '0',
+        'max_retries': '3',
+        'concurrency': '4'
+    }
     papagoVer: str = None
 
     # https://github.com/zyddnys/manga-image-translator/blob/main/translators/papago.py
@@ -282,13 +619,27 @@ class PapagoTranslator(TranslatorBase):
         self.lang_map['español'] = 'es'        
         
         if self.papagoVer is None:
-            script = requests.get('https://papago.naver.com', proxies=PROXY)
-            mainJs = re.search(r'\/(main.*\.js)', script.text).group(1)
-            papagoVerData = requests.get('https://papago.naver.com/' + mainJs, proxies=PROXY)
-            papagoVer = re.search(r'"PPG .*,"(v[^"]*)', papagoVerData.text).group(1)
-            self.papagoVer = PapagoTranslator.papagoVer = papagoVer
+            self.papagoVer = PapagoTranslator.papagoVer = BOOTSTRAP_CACHE.get('papagoVer', self._fetch_papago_ver)
+
+    def _fetch_papago_ver(self) -> str:
+        script = self.http.get('https://papago.naver.com')
+        mainJs = re.search(r'\/(main.*\.js)', script.text).group(1)
+        papagoVerData = self.http.get('https://papago.naver.com/' + mainJs)
+        return re.search(r'"PPG .*,"(v[^"]*)', papagoVerData.text).group(1)
 
     def _translate(self, text: Union[str, List]) -> Union[str, List]:
+        resp = self._post_translate(text)
+        if resp.status_code in {401, 403}:
+            # the cached version might be outdated
+            BOOTSTRAP_CACHE.invalidate('papagoVer')
+            self.papagoVer = PapagoTranslator.papagoVer = BOOTSTRAP_CACHE.get('papagoVer', self._fetch_papago_ver)
+            resp = self._post_translate(text)
+        self.check_response(resp)
+        translations = resp.json()['translatedText']
+    
+        return translations
+
+    def _post_translate(self, text: Union[str, List]) -> requests.Response:
         data = {}
         data['source'] = self.lang_map[self.lang_source]
         data['target'] = self.lang_map[self.lang_target]
@@ -307,10 +658,7 @@ class PapagoTranslator(TranslatorBase):
             "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
             "Timestamp": str(timestamp),
         }
-        resp = requests.post(PAPAGO_URL, data, headers=headers)
-        translations = resp.json()['translatedText']
-    
-        return translations
+        return self.http.post(PAPAGO_URL, data, headers=headers)
         
 
 @register_translator('caiyun')
@@ -318,9 +666,14 @@ class CaiyunTranslator(TranslatorBase):
 
     concate_text = False
     cht_require_convert = True
+    max_batch_chars = 4500
+    max_batch_segments = 200
     setup_params: Dict = {
         'token': '',
-        'delay': '0.0'
+        'requests_per_sec': '2',
+        'chars_per_sec': '0',
+        'max_retries': '3',
+        'concurrency': '4'
     }
 
     def _setup_translator(self):
@@ -350,7 +703,8 @@ class CaiyunTranslator(TranslatorBase):
             "x-authorization": "token " + token,
         }
 
-        response = requests.request("POST", url, data=json.dumps(payload), headers=headers)
+        response = self.http.post(url, data=json.dumps(payload), headers=headers)
+        self.check_response(response)
         translations = json.loads(response.text)["target"]
 
         return translations
@@ -360,10 +714,15 @@ class CaiyunTranslator(TranslatorBase):
 class BaiduTranslator(TranslatorBase):
     concate_text = False
     cht_require_convert = True
+    # 6000 bytes of utf-8 encoded query
+    max_batch_chars = 2000
     setup_params: Dict = {
         'token': '',
         'appId': '',
-        'delay': '0.0'
+        'requests_per_sec': '1',
+        'chars_per_sec': '0',
+        'max_retries': '3',
+        'concurrency': '1'
     }
     @staticmethod
     def get_json(from_lang, to_lang, query_text,BAIDU_APP_ID,BAIDU_SECRET_KEY):
@@ -409,7 +768,8 @@ class BaiduTranslator(TranslatorBase):
             "Content-Type": "application/x-www-form-urlencoded"
         }
 
-        response = requests.request("POST", 'https://fanyi-api.baidu.com/api/trans/vip/translate', data=payload, headers=headers)
+        response = self.http.post('https://fanyi-api.baidu.com/api/trans/vip/translate', data=payload, headers=headers)
+        self.check_response(response)
         result = json.loads(response.text)
         result_list = []
         if "trans_result" not in result:
@@ -433,9 +793,14 @@ class DeeplTranslator(TranslatorBase):
 
     concate_text = False
     cht_require_convert = True
+    max_batch_chars = 30000
+    max_batch_segments = 50
     setup_params: Dict = {
         'api_key': '',
-        'delay': '0.0',
+        'requests_per_sec': '2',
+        'chars_per_sec': '0',
+        'max_retries': '3',
+        'concurrency': '8',
     }
 
     def _setup_translator(self):
@@ -463,10 +828,23 @@ class DeeplTranslator(TranslatorBase):
         self.lang_map['Slovenčina'] = 'sk'
         self.lang_map['Slovenščina'] = 'sl'
         self.lang_map['Svenska'] = 'sv'
+        self._client: deepl.Translator = None
+        self._client_key: str = None
+        self._client_lock = threading.Lock()
         
-    def _translate(self, text: Union[str, List]) -> Union[str, List]:
+    def deepl_client(self) -> deepl.Translator:
+        '''
+        built once per api key, the client keeps its own connection pool
+        '''
         api_key = self.setup_params['api_key']
-        translator = deepl.Translator(api_key)
+        with self._client_lock:
+            if self._client is None or self._client_key != api_key:
+                self._client = deepl.Translator(api_key, proxy=PROXY.get('https') or None)
+                self._client_key = api_key
+            return self._client
+
+    def _translate(self, text: Union[str, List]) -> Union[str, List]:
+        translator = self.deepl_client()
         source = self.lang_map[self.lang_source]
         target = self.lang_map[self.lang_target]
         if source == 'EN-US':
@@ -482,21 +860,54 @@ SUGOIMODEL_TOKENIZATOR_PATH = SUGOIMODEL_TRANSLATOR_DIRPATH + "spm.ja.nopretok.m
 class SugoiTranslator(TranslatorBase):
 
     concate_text = False
+    # sentences of several pages go through one translate_batch call
+    max_batch_segments = 256
     setup_params: Dict = {
         'device': {
             'type': 'selector',
             'options': ['cpu', 'cuda'],
             'select': 'cpu'
-        }
+        },
+        'compute_type': {
+            'type': 'selector',
+            'options': ['default', 'int8', 'int8_float32', 'int8_float16', 'float16', 'float32'],
+            'select': 'default'
+        },
+        'inter_threads': '1',
+        'intra_threads': '0',
+        'max_batch_size': '32',
+        'beam_size': '2'
     }
+    # params the ctranslate2.Translator is built with
+    model_params = {'device', 'compute_type', 'inter_threads', 'intra_threads'}
 
     def _setup_translator(self):
         self.lang_map['日本語'] = 'ja'
         self.lang_map['English'] = 'en'
         
-        self.translator = ctranslate2.Translator(SUGOIMODEL_TRANSLATOR_DIRPATH, device=self.setup_params['device']['select'])
+        self.translator = self._load_model()
         self.tokenizator = spm.SentencePieceProcessor(model_file=SUGOIMODEL_TOKENIZATOR_PATH)
 
+    def _int_param(self, param_key: str, default: int) -> int:
+        try:
+            return int(self.setup_params[param_key])
+        except:
+            return default
+
+    def _compute_type(self) -> str:
+        # setup params of older configs don't have it
+        if 'compute_type' in self.setup_params:
+            return self.setup_params['compute_type']['select']
+        return 'default'
+
+    def _load_model(self) -> ctranslate2.Translator:
+        # ctranslate2 falls back to the closest compute type the device supports
+        return ctranslate2.Translator(SUGOIMODEL_TRANSLATOR_DIRPATH, 
+                                      device=self.setup_params['device']['select'],
+                                      compute_type=self._compute_type(),
+                                      inter_threads=max(1, self._int_param('inter_threads', 1)),
+                                      intra_threads=max(0, self._int_param('intra_threads', 0)))
+
     def _translate(self, text: Union[str, List]) -> Union[str, List]:
         input_is_lst = True
         if isinstance(text, str):
@@ -504,8 +915,11 @@ class SugoiTranslator(TranslatorBase):
             input_is_lst = False
         
         text = [i.replace(".", "@").replace("．", "@") for i in text]
-        tokenized_text = self.tokenizator.encode(text, out_type=str, enable_sampling=True, alpha=0.1, nbest_size=-1)
-        tokenized_translated = self.translator.translate_batch(tokenized_text)
+        # deterministic tokenization, so the same sentence always gets the same translation and can be cached
+        tokenized_text = self.tokenizator.encode(text, out_type=str)
+        tokenized_translated = self.translator.translate_batch(tokenized_text, 
+                                                               max_batch_size=max(0, self._int_param('max_batch_size', 32)),
+                                                               beam_size=max(1, self._int_param('beam_size', 2)))
         text_translated = [''.join(text[0]["tokens"]).replace('▁', ' ').replace("@", ".") for text in tokenized_translated]
         
         if not input_is_lst:
@@ -514,10 +928,10 @@ class SugoiTranslator(TranslatorBase):
 
     def updateParam(self, param_key: str, param_content):
         super().updateParam(param_key, param_content)
-        if param_key == 'device':
+        if param_key in self.model_params:
             if hasattr(self, 'translator'):
                 delattr(self, 'translator')
-            self.translator = ctranslate2.Translator(SUGOIMODEL_TRANSLATOR_DIRPATH, device=self.setup_params['device']['select'])
+            self.translator = self._load_model()
 
     @property
     def supported_tgt_list(self) -> List[str]:
@@ -532,9 +946,13 @@ class SugoiTranslator(TranslatorBase):
 class YandexTranslator(TranslatorBase):
 
     concate_text = False
+    max_batch_chars = 9000
     setup_params: Dict = {
         'api_key': '',
-        'delay': '0.0',
+        'requests_per_sec': '10',
+        'chars_per_sec': '0',
+        'max_retries': '3',
+        'concurrency': '8',
     }
 
     def _setup_translator(self):
@@ -571,7 +989,9 @@ class YandexTranslator(TranslatorBase):
             "Authorization": "Api-Key {0}".format(self.setup_params['api_key'])
         }
 
-        translations = requests.post(self.api_url, json=body, headers=headers).json()['translations']
+        response = self.http.post(self.api_url, json=body, headers=headers)
+        self.check_response(response)
+        translations = response.json()['translations']
         if isinstance(text, str):
             return translations[0]['text']
         tr_list = []
@@ -582,6 +1002,179 @@ class YandexTranslator(TranslatorBase):
                 tr_list.append('')
         return tr_list
 
+@register_translator('Hedged')
+class HedgedTranslator(TranslatorBase):
+    '''
+    Wraps an ordered list of translators, a request goes to the first one, 
+    if it hasn't answered within the latency budget the next one is asked as well and the first answer wins.
+    A backend that fails hands over to the next one right away.
+    '''
+
+    concate_text = False
+    setup_params: Dict = {
+        'backends': 'google,papago',
+        # seconds, or 'auto' for the p95 latency of the backend asked last
+        'latency_budget': 'auto'
+    }
+    # translator name -> setup params of backends, the app points it to DLModuleConfig.translator_setup_params
+    backend_setup_params: Dict[str, Dict] = {}
+    default_latency_budget = 5.
+    min_latency_budget = 0.5
+    max_latency_budget = 30.
+
+    def _setup_translator(self):
+        self.backends: List[TranslatorBase] = []
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self._executor: ThreadPoolExecutor = None
+        self._build_backends()
+
+    def _build_backends(self):
+        backends = []
+        for name in self.setup_params['backends'].split(','):
+            name = name.strip()
+            if name == '' or name == self.name:
+                continue
+            if name not in TRANSLATORS.module_dict:
+                raise TranslatorNotValid(f'Hedged: unknown translator {name}')
+            params = self.backend_setup_params.get(name)
+            if params is None:
+                params = copy.deepcopy(TRANSLATORS.module_dict[name].setup_params)
+            backends.append(TRANSLATORS.module_dict[name](self.lang_source, self.lang_target, raise_unsupported_lang=False, **(params or {})))
+        if len(backends) == 0:
+            raise MissingTranslatorParams('backends')
+        self.backends = backends
+        for backend in backends:
+            self.latency.setdefault(backend.name, LatencyHistogram())
+        self.lang_map = backends[0].lang_map.copy()
+        # requests have to fit every backend
+        self.max_batch_chars = min([b.max_batch_chars for b in backends if b.max_batch_chars > 0], default=0)
+        self.max_batch_segments = min([b.max_batch_segments for b in backends if b.max_batch_segments > 0], default=0)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        # every request in flight may have each backend asked at once
+        self._executor = ThreadPoolExecutor(max(4, len(backends) * self.concurrency()), thread_name_prefix='hedged')
+
+    @check_language_support(check_type='source')
+    def set_source(self, lang: str):
+        self.lang_source = lang
+        for backend in self.backends:
+            if lang in backend.supported_src_list:
+                backend.set_source(lang)
+
+    @check_language_support(check_type='target')
+    def set_target(self, lang: str):
+        self.lang_target = lang
+        for backend in self.backends:
+            if lang in backend.supported_tgt_list:
+                backend.set_target(lang)
+
+    def usable_backends(self) -> List[TranslatorBase]:
+        return [b for b in self.backends if b.lang_source == self.lang_source and b.lang_target == self.lang_target]
+
+    def concurrency(self) -> int:
+        '''
+        the most any backend allows, each backend still bounds its own requests in flight with its rate limiter & window
+        '''
+        return max([b.concurrency() for b in self.backends])
+
+    def latency_budget(self, backend: TranslatorBase) -> float:
+        budget = self.setup_params['latency_budget']
+        try:
+            return max(0., float(budget))
+        except:
+            pass
+        # adapt to the backend's recent latency
+        p95 = self.latency[backend.name].quantile(0.95)
+        if p95 is None or self.latency[backend.name].count < 10:
+            return self.default_latency_budget
+        return min(max(p95, self.min_latency_budget), self.max_latency_budget)
+
+    def _call_backend(self, backend: TranslatorBase, text: Union[str, List], answered: threading.Lock):
+        '''
+        the first backend to succeed takes answered, others return None
+        '''
+        if answered.locked():
+            # dequeued after another backend answered
+            return None
+        t0 = time.perf_counter()
+        try:
+            rst = backend.translate(text)
+        except Exception:
+            self.latency[backend.name].add_failure()
+            raise
+        # late answers of losing requests are recorded too
+        self.latency[backend.name].add(time.perf_counter() - t0)
+        if not answered.acquire(blocking=False):
+            # backends have no cache or dedup memo of their own, so a late result goes nowhere
+            return None
+        return rst
+
+    def _translate(self, text: Union[str, List]) -> Union[str, List]:
+        backends = self.usable_backends()
+        if len(backends) == 0:
+            raise InvalidSourceOrTargetLanguage(f'Hedged: no backend supports {self.lang_source} -> {self.lang_target}')
+        pending: Dict[Future, TranslatorBase] = {}
+        errors = []
+        next_backend = 0
+        answered = threading.Lock()
+
+        def launch():
+            nonlocal next_backend
+            backend = backends[next_backend]
+            next_backend += 1
+            backend.cancel_token = self.cancel_token
+            pending[self._executor.submit(self._call_backend, backend, text, answered)] = backend
+
+        launch()
+        try:
+            while pending:
+                timeout = self.latency_budget(backends[next_backend - 1]) if next_backend < len(backends) else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    LOGGER.debug(f'{backends[next_backend - 1].name} exceeded the latency budget of {timeout:.2f}s, hedging with {backends[next_backend].name}')
+                    launch()
+                    continue
+                for future in done:
+                    backend = pending.pop(future)
+                    try:
+                        rst = future.result()
+                    except Exception as e:
+                        LOGGER.warning(f'{backend.name} failed: {repr(e)}')
+                        errors.append(e)
+                        continue
+                    if rst is not None:
+                        return rst
+                if not pending and next_backend < len(backends):
+                    launch()
+            raise errors[-1]
+        finally:
+            # losing requests still queued are never sent, those already sent finish & are dropped
+            answered.acquire(blocking=False)
+            for future in pending:
+                future.cancel()
+
+    def updateParam(self, param_key: str, param_content):
+        super().updateParam(param_key, param_content)
+        if param_key == 'backends':
+            self._build_backends()
+            self.valid_lang_list = [lang for lang in self.lang_map if self.lang_map[lang] != '']
+
+    def stats_summary(self) -> str:
+        summary = super().stats_summary()
+        lines = [summary] if summary else []
+        lines += [f'  {name:<12} {hist.summary()}' for name, hist in self.latency.items()]
+        lines += [backend.stats_summary() for backend in self.backends if backend.stats_summary()]
+        return '\n'.join(lines)
+
+    @property
+    def supported_tgt_list(self) -> List[str]:
+        return self.backends[0].supported_tgt_list if self.backends else self.valid_lang_list
+
+    @property
+    def supported_src_list(self) -> List[str]:
+        return self.backends[0].supported_src_list if self.backends else self.valid_lang_list
+
+
 # "dummy translator" is the name showed in the app
 # @register_translator('dummy translator')
 # class DummyTranslator(TranslatorBase):
@@ -0,0 +1,118 @@
+import os, re, time, sqlite3, hashlib, threading
+import os.path as osp
+from typing import Dict, List
+
+TRANSLATION_CACHE_PATH = 'data/cache/translation_cache.db'
+
+
+def normalize_text(text: str) -> str:
+    '''
+    strip & collapse horizontal whitespace so the same line recognized slightly differently still hits the cache
+    '''
+    return re.sub(r'[ \t　]+', ' ', text.strip())
+
+
+class TranslationCache:
+    '''
+    Persistent translation memory in SQLite, keyed by a translator signature
+    (name, setup params affecting results, language pair) and the normalized source text.
+    Least recently used entries are evicted once there are more than max_entries.
+    '''
+
+    def __init__(self, db_path: str = TRANSLATION_CACHE_PATH, max_entries: int = 100000) -> None:
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._num_puts = 0
+        self._lock = threading.Lock()
+        if osp.dirname(db_path):
+            os.makedirs(osp.dirname(db_path), exist_ok=True)
+        # shared by translator threads, access is serialized by _lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, translation TEXT NOT NULL, atime REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS translations_atime ON translations (atime)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(signature: str, text: str) -> str:
+        return hashlib.blake2b((signature + '\0' + normalize_text(text)).encode('utf-8'), digest_size=16).hexdigest()
+
+    def get_many(self, signature: str, text_list: List[str]) -> Dict[int, str]:
+        '''
+        cached translations of text_list, keyed by their indices
+        '''
+        keys = [self.make_key(signature, text) for text in text_list]
+        found = {}
+        with self._lock:
+            for ii in range(0, len(keys), 500):
+                chunk = list(set(keys[ii: ii + 500]))
+                rows = self._conn.execute(f'SELECT key, translation FROM translations WHERE key IN ({",".join("?" * len(chunk))})', chunk).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany('UPDATE translations SET atime = ? WHERE key = ?', [(time.time(), key) for key in found])
+                self._conn.commit()
+            rst = {ii: found[key] for ii, key in enumerate(keys) if key in found}
+            # translator threads look up concurrently
+            self.hits += len(rst)
+            self.misses += len(keys) - len(rst)
+        return rst
+
+    def put_many(self, signature: str, text_list: List[str], translations: List[str]):
+        now = time.time()
+        rows = [(self.make_key(signature, text), translation, now) for text, translation in zip(text_list, translations)]
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO translations (key, translation, atime) VALUES (?, ?, ?)', rows)
+            self._num_puts += len(rows)
+            # counting rows is a full scan, only check the size limit every few hundred inserts
+            if self._num_puts >= 256:
+                self._num_puts = 0
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        num_entries = self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        if self.max_entries > 0 and num_entries > self.max_entries:
+            self._conn.execute('DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY atime LIMIT ?)',
+                               (num_entries - self.max_entries, ))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM translations')
+            self._conn.commit()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def summary(self) -> str:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        hit_rate = hits / total * 100 if total > 0 else 0.
+        return f'translation cache   {hits} hits, {misses} misses ({hit_rate:.1f}% hit rate)'
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches: Dict[str, TranslationCache] = {}
+_caches_lock = threading.Lock()
+
+def open_translation_cache(db_path: str = TRANSLATION_CACHE_PATH, max_entries: int = 100000) -> TranslationCache:
+    '''
+    translators sharing a database share one connection
+    '''
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = _caches[db_path] = TranslationCache(db_path, max_entries)
+        cache.max_entries = max_entries
+        return cache
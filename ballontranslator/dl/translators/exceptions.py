@@ -111,8 +111,9 @@ class TooManyRequests(Exception):
     exception thrown if an error occurred during the request call, e.g a connection problem.
     """
 
-    def __init__(self, message="Server Error: You made too many requests to the server. According to google, you are allowed to make 5 requests per second and up to 200k requests per day. You can wait and try again later or you can try the translate_batch function"):
+    def __init__(self, message="Server Error: You made too many requests to the server. According to google, you are allowed to make 5 requests per second and up to 200k requests per day. You can wait and try again later or you can try the translate_batch function", retry_after: float = None):
         self.message = message
+        self.retry_after = retry_after
 
     def __str__(self):
         return self.message
@@ -133,8 +134,10 @@ class ServerException(Exception):
         503: "ERR_SERVICE_NOT_AVAIBLE",
     }
 
-    def __init__(self, status_code, *args):
+    def __init__(self, status_code, *args, retry_after: float = None):
         message = self.errors.get(status_code, "API server error")
+        self.status_code = status_code
+        self.retry_after = retry_after
         super(ServerException, self).__init__(message, *args)
 
 
@@ -3,7 +3,9 @@ google translator API copied from https://pypi.org/project/deep-translator/
 """
 
 from .constants import BASE_URLS, GOOGLE_LANGUAGES_TO_CODES, GOOGLE_LANGUAGES_SECONDARY_NAMES
-from .exceptions import TooManyRequests, LanguageNotSupportedException, TranslationNotFound, NotValidPayload, RequestError, InvalidSourceOrTargetLanguage, NotValidLength
+from .exceptions import TooManyRequests, LanguageNotSupportedException, TranslationNotFound, NotValidPayload, RequestError, InvalidSourceOrTargetLanguage, NotValidLength, ServerException
+from utils.ratelimit import parse_retry_after
+from .transport import TRANSPORT
 from bs4 import BeautifulSoup
 import requests
 from time import sleep
@@ -183,11 +185,14 @@ class GoogleTranslator(BaseTranslator):
 
             if self.payload_key:
                 self._url_params[self.payload_key] = text
-            response = requests.get(self.__base_url,
-                                    params=self._url_params,
-                                    proxies=self.proxies)
+            response = TRANSPORT.get(self.__base_url,
+                                     params=self._url_params,
+                                     proxies=self.proxies)
             if response.status_code == 429:
-                raise TooManyRequests()
+                raise TooManyRequests(retry_after=parse_retry_after(response.headers.get('Retry-After')))
+
+            if response.status_code >= 500:
+                raise ServerException(response.status_code, retry_after=parse_retry_after(response.headers.get('Retry-After')))
 
             if response.status_code != 200:
                 raise RequestError()
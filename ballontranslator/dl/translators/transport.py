@@ -0,0 +1,117 @@
+import os, time, json, threading, urllib.request
+import os.path as osp
+from typing import Any, Callable, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PROXY = urllib.request.getproxies()
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (10, 60)
+BOOTSTRAP_CACHE_PATH = 'data/cache/translator_bootstrap.json'
+
+
+class HTTPTransport:
+    '''
+    One pooled keep-alive session shared by all online translators,
+    so TLS handshakes are paid once per host instead of once per request.
+    '''
+
+    def __init__(self, pool_maxsize: int = 16, timeout=DEFAULT_TIMEOUT, proxies: Dict = None) -> None:
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.proxies = PROXY if proxies is None else proxies
+        self._session: requests.Session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_maxsize, pool_maxsize=self.pool_maxsize)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+                    session.proxies.update(self.proxies)
+                    self._session = session
+        return self._session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, data=None, json=None, **kwargs) -> requests.Response:
+        return self.request('POST', url, data=data, json=json, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class BootstrapCache:
+    '''
+    Small json file of values translators scrape or negotiate before they can send requests, e.g. papago's version,
+    each entry expires after the ttl given on lookup.
+    '''
+
+    def __init__(self, cache_path: str = BOOTSTRAP_CACHE_PATH) -> None:
+        self.cache_path = cache_path
+        self._entries: Dict = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        if osp.exists(self.cache_path):
+            try:
+                with open(self.cache_path, 'r', encoding='utf8') as f:
+                    self._entries = json.loads(f.read())
+            except Exception:
+                pass
+
+    def _save(self):
+        if osp.dirname(self.cache_path):
+            os.makedirs(osp.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            f.write(json.dumps(self._entries, ensure_ascii=False))
+        os.replace(tmp_path, self.cache_path)
+
+    def get(self, key: str, fetch: Callable, ttl: float = 86400) -> Any:
+        '''
+        cached value of key if it's younger than ttl seconds, otherwise fetch(), store & return it
+        '''
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry['time'] < ttl:
+                return entry['value']
+        value = fetch()
+        with self._lock:
+            self._entries[key] = {'value': value, 'time': time.time()}
+            try:
+                self._save()
+            except Exception:
+                pass
+        return value
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._load()
+            if self._entries.pop(key, None) is not None:
+                try:
+                    self._save()
+                except Exception:
+                    pass
+
+
+TRANSPORT = HTTPTransport()
+BOOTSTRAP_CACHE = BootstrapCache()
@@ -1,15 +1,17 @@
-import sys, os
+import sys, os, copy
 import os.path as osp
 sys.path.append(osp.dirname(osp.dirname(__file__)))
 
-from dl import InpainterBase, AOTInpainter, PatchmatchInpainter
+from dl import InpainterBase, AOTInpainter, PatchmatchInpainter, LamaInpainterMPE
 from utils.io_utils import imread, imwrite, find_all_imgs
+from utils.imgproc_utils import psnr
 from ui.imgtrans_proj import ProjImgTrans
 from ui.constants import PROGRAM_PATH
 os.chdir(PROGRAM_PATH)
 
 import numpy as np
 import cv2
+import torch
 from tqdm import tqdm
 
 SAVE_DIR = 'tmp/inpaint_test'
@@ -57,10 +59,70 @@ def test_patchmatch(proj: ProjImgTrans, inpaint_by_block=True, show=False):
     inpainter = PatchmatchInpainter()
     test_inpainter(inpainter, proj, show=show, inpaint_by_block=inpaint_by_block)
 
+def test_onnx_parity(inpainter_cls, proj: ProjImgTrans, atol: float = 1e-3, min_psnr: float = 40., num_pages: int = 3):
+    '''
+    the onnxruntime backend should match torch on raw outputs of several shapes & on inpainted pages
+    '''
+    setup_params = copy.deepcopy(inpainter_cls.setup_params)
+    setup_params['device']['select'] = 'cpu'
+    torch_inpainter = inpainter_cls(**copy.deepcopy(setup_params))
+    setup_params['backend']['select'] = 'onnxruntime'
+    ort_inpainter = inpainter_cls(**setup_params)
+
+    for batch, h, w in [(1, 256, 256), (2, 384, 512), (1, 640, 448)]:
+        mask = np.zeros((h, w), dtype=np.uint8)
+        mask[h // 4: h // 2, w // 3: w // 3 * 2] = 255
+        img = (np.random.rand(h, w, 3) * 255).astype(np.uint8)
+        inputs = ort_inpainter.inpaint_preprocess(img, mask, pad_to=(h, w))
+        num_tensors = 4 if inpainter_cls == LamaInpainterMPE else 2
+        tensors = [torch.cat([t] * batch) for t in inputs[:num_tensors]]
+        with torch.no_grad():
+            torch_out = torch_inpainter.model(*tensors)
+        ort_out = ort_inpainter.ort_model(*tensors)
+        max_diff = (torch_out - ort_out).abs().max().item()
+        print(f'{inpainter_cls.__name__} {batch}x{h}x{w} max abs diff: {max_diff:.6f}')
+        assert max_diff < atol
+
+    for page_name in list(proj.pages)[:num_pages]:
+        proj.set_current_img(page_name)
+        img, mask = proj.img_array, proj.mask_array
+        inpainted_torch = torch_inpainter.inpaint(img, mask.copy(), proj.pages[page_name])
+        inpainted_ort = ort_inpainter.inpaint(img, mask.copy(), proj.pages[page_name])
+        page_psnr = psnr(inpainted_torch, inpainted_ort)
+        print(f'{inpainter_cls.__name__} {page_name} psnr: {page_psnr:.2f}')
+        assert page_psnr > min_psnr
+
+def test_batch_inpaint(inpainter_cls, min_psnr: float = 30.):
+    '''
+    a crop alone in its batch keeps the single image padding, crops batched together stay close to it
+    '''
+    setup_params = copy.deepcopy(inpainter_cls.setup_params)
+    setup_params['device']['select'] = 'cpu'
+    inpainter = inpainter_cls(**setup_params)
+
+    imgs, masks = [], []
+    for h, w in [(100, 150), (100, 150), (90, 200)]:
+        img = np.full((h, w, 3), 255, dtype=np.uint8)
+        cv2.putText(img, 'text', (10, h // 2), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+        mask = cv2.dilate(255 - img[..., 0], np.ones((5, 5), np.uint8))
+        imgs.append(img)
+        masks.append(mask)
+    singles = [inpainter._inpaint(img, mask) for img, mask in zip(imgs, masks)]
+    batched = inpainter._inpaint_batch(imgs, masks)
+    assert np.array_equal(batched[2], singles[2])
+    for single, inpainted in zip(singles[:2], batched[:2]):
+        batch_psnr = psnr(single, inpainted)
+        print(f'{inpainter_cls.__name__} batched crop psnr: {batch_psnr:.2f}')
+        assert batch_psnr > min_psnr
+
 if __name__ == '__main__':
 
     manga_dir = 'data/testpacks/manga'
     manga_proj = ProjImgTrans(manga_dir)
     # comic_proj = ProjImgTrans(comic_dir2)
     test_aot(manga_proj, device='cuda', inpaint_by_block=True, inpaint_size=2048)
-    # test_patchmatch(comic_proj, inpaint_by_block=False)
\ No newline at end of file
+    # test_patchmatch(comic_proj, inpaint_by_block=False)
+    # test_onnx_parity(AOTInpainter, manga_proj)
+    # test_onnx_parity(LamaInpainterMPE, manga_proj)
+    # test_batch_inpaint(AOTInpainter)
+    # test_batch_inpaint(LamaInpainterMPE)
\ No newline at end of file
@@ -0,0 +1,94 @@
+import sys, os, copy, time
+import os.path as osp
+sys.path.append(osp.dirname(osp.dirname(__file__)))
+from difflib import SequenceMatcher
+
+from dl import OCRMIT32px, OCRMIT48pxCTC, AOTInpainter, LamaInpainterMPE, ComicTextDetector
+from utils.io_utils import imread, find_all_imgs
+from utils.imgproc_utils import psnr
+from ui.constants import PROGRAM_PATH
+os.chdir(PROGRAM_PATH)
+
+import numpy as np
+
+TESTPACKS = ['data/testpacks/manga', 'data/testpacks/comics']
+
+
+def load_testpacks():
+    '''
+    pages of the testpacks with masks & text blocks from the cpu text detector
+    '''
+    setup_params = copy.deepcopy(ComicTextDetector.setup_params)
+    setup_params['device']['select'] = 'cpu'
+    detector = ComicTextDetector(**setup_params)
+    pages = []
+    for pack_dir in TESTPACKS:
+        for img_name in find_all_imgs(pack_dir):
+            img = imread(osp.join(pack_dir, img_name))
+            mask, blk_list = detector.detect(img)
+            pages.append((img_name, img, mask, blk_list))
+    return pages
+
+
+def run_ocr(ocr_cls, precision: str, pages):
+    setup_params = copy.deepcopy(ocr_cls.setup_params)
+    setup_params['device']['select'] = 'cpu'
+    setup_params['precision']['select'] = precision
+    ocr = ocr_cls(**setup_params)
+    texts, time_cost = [], 0
+    for _, img, _, blk_list in pages:
+        blk_list = copy.deepcopy(blk_list)
+        for blk in blk_list:
+            blk.text = []
+        t0 = time.time()
+        ocr.ocr_blk_list(img, blk_list)
+        time_cost += time.time() - t0
+        texts += [blk.get_text() for blk in blk_list]
+    return texts, time_cost
+
+
+def test_ocr_precision(ocr_cls, pages, precision: str = 'dynamic-int8', min_char_acc: float = 0.97):
+    '''
+    text of the quantized model against fp32, per block exact match & character accuracy
+    '''
+    ref_texts, ref_time = run_ocr(ocr_cls, 'fp32', pages)
+    texts, t = run_ocr(ocr_cls, precision, pages)
+    num_exact = sum([ref == text for ref, text in zip(ref_texts, texts)])
+    num_chars = sum([len(ref) for ref in ref_texts])
+    num_matched = sum([sum(m.size for m in SequenceMatcher(None, ref, text).get_matching_blocks()) for ref, text in zip(ref_texts, texts)])
+    char_acc = num_matched / max(num_chars, 1)
+    print(f'{ocr_cls.__name__} {precision}: {num_exact}/{len(ref_texts)} blocks exact, char acc {char_acc:.4f}, '
+          f'fp32 {ref_time:.2f}s, {precision} {t:.2f}s ({ref_time / t:.2f}x)')
+    assert char_acc >= min_char_acc
+
+
+def run_inpainter(inpainter_cls, precision: str, pages):
+    setup_params = copy.deepcopy(inpainter_cls.setup_params)
+    setup_params['device']['select'] = 'cpu'
+    setup_params['precision']['select'] = precision
+    inpainter = inpainter_cls(**setup_params)
+    rst, time_cost = [], 0
+    for _, img, mask, blk_list in pages:
+        t0 = time.time()
+        rst.append(inpainter.inpaint(img, mask.copy(), blk_list))
+        time_cost += time.time() - t0
+    return rst, time_cost
+
+
+def test_inpaint_precision(inpainter_cls, pages, precision: str = 'bf16', min_psnr: float = 35.):
+    ref_imgs, ref_time = run_inpainter(inpainter_cls, 'fp32', pages)
+    imgs, t = run_inpainter(inpainter_cls, precision, pages)
+    for (page_name, _, _, _), ref, inpainted in zip(pages, ref_imgs, imgs):
+        page_psnr = psnr(ref, inpainted)
+        print(f'{inpainter_cls.__name__} {precision} {page_name} psnr: {page_psnr:.2f}')
+        assert page_psnr > min_psnr
+    print(f'{inpainter_cls.__name__} fp32 {ref_time:.2f}s, {precision} {t:.2f}s ({ref_time / t:.2f}x)')
+
+
+if __name__ == '__main__':
+    pages = load_testpacks()
+    test_ocr_precision(OCRMIT48pxCTC, pages, 'dynamic-int8')
+    test_ocr_precision(OCRMIT32px, pages, 'dynamic-int8')
+    # test_ocr_precision(OCRMIT48pxCTC, pages, 'bf16')
+    test_inpaint_precision(AOTInpainter, pages, 'bf16')
+    test_inpaint_precision(LamaInpainterMPE, pages, 'bf16')
@@ -0,0 +1,118 @@
+import sys, os, time, json, threading
+import os.path as osp
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.append(osp.dirname(osp.dirname(__file__)))
+import requests
+from dl.translators import *
+from utils.pipeline import StagedPipeline
+from ui.constants import PROGRAM_PATH
+os.chdir(PROGRAM_PATH)
+
+LATENCY = 0.3
+
+
+class MockTranslateHandler(BaseHTTPRequestHandler):
+    '''
+    "translates" a list of texts by upper-casing them after LATENCY seconds
+    '''
+    active = 0
+    max_active = 0
+    num_requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = MockTranslateHandler
+        with cls.lock:
+            cls.active += 1
+            cls.num_requests += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        texts = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['texts']
+        time.sleep(LATENCY)
+        body = json.dumps({'translations': [t.upper() for t in texts]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with cls.lock:
+            cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class MockTranslator(TranslatorBase):
+
+    concate_text = False
+    max_batch_segments = 6
+    setup_params: Dict = {
+        'url': '',
+        'concurrency': '4'
+    }
+
+    def _setup_translator(self):
+        self.lang_map['日本語'] = 'ja'
+        self.lang_map['English'] = 'en'
+
+    def _translate(self, text: Union[str, List]) -> Union[str, List]:
+        texts = [text] if isinstance(text, str) else text
+        translations = requests.post(self.setup_params['url'], json={'texts': texts}).json()['translations']
+        return translations[0] if isinstance(text, str) else translations
+
+
+def run_translate_stage(translator: MockTranslator, pages: List[List[TextBlock]]) -> List[int]:
+    finished = []
+    pipeline = StagedPipeline(2)
+    pipeline.add_stage('translate', translator.translate_textblk_lst_batch,
+                       on_finished=lambda blk_list: finished.append(pages.index(blk_list)),
+                       batch_fits=translator.batch_fits, concurrency=translator.concurrency())
+    pipeline.run(pages)
+    return finished
+
+
+def test_concurrency(url: str, num_pages: int = 24, blks_per_page: int = 3):
+    pages = [[TextBlock([0, 0, 1, 1], text=[f'page{ii} blk{jj}']) for jj in range(blks_per_page)] for ii in range(num_pages)]
+    num_batches = num_pages * blks_per_page // MockTranslator.max_batch_segments
+
+    sequential = MockTranslator('日本語', 'English', url=url, concurrency='1')
+    t0 = time.time()
+    run_translate_stage(sequential, pages)
+    t_seq = time.time() - t0
+
+    MockTranslateHandler.max_active = MockTranslateHandler.num_requests = 0
+    concurrent = MockTranslator('日本語', 'English', url=url, concurrency='4')
+    t0 = time.time()
+    finished = run_translate_stage(concurrent, pages)
+    t_con = time.time() - t0
+    print(f'{num_pages} pages, {MockTranslateHandler.num_requests} requests, sequential: {t_seq:.2f}s, concurrency 4: {t_con:.2f}s')
+
+    assert finished == list(range(num_pages)), 'pages finished out of order'
+    assert MockTranslateHandler.num_requests == num_batches
+    assert MockTranslateHandler.max_active == 4
+    for ii, page in enumerate(pages):
+        for jj, blk in enumerate(page):
+            assert blk.translation == f'PAGE{ii} BLK{jj}'
+    assert t_con < t_seq / 2
+
+
+def test_long_page(url: str, num_blks: int = 40):
+    page = [TextBlock([0, 0, 1, 1], text=[f'long page blk{jj}']) for jj in range(num_blks)]
+    MockTranslateHandler.max_active = MockTranslateHandler.num_requests = 0
+    translator = MockTranslator('日本語', 'English', url=url, concurrency='4')
+    t0 = time.time()
+    translator.translate_textblk_lst(page)
+    print(f'{num_blks} blocks of one page, {MockTranslateHandler.num_requests} requests: {time.time() - t0:.2f}s')
+
+    assert MockTranslateHandler.num_requests == -(-num_blks // MockTranslator.max_batch_segments)
+    assert MockTranslateHandler.max_active > 1
+    for jj, blk in enumerate(page):
+        assert blk.translation == f'LONG PAGE BLK{jj}'
+
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockTranslateHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/translate'
+    test_concurrency(url)
+    test_long_page(url)
+    server.shutdown()
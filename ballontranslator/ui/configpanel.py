@@ -21,6 +21,9 @@ from .misc import ProgramConfig, DLModuleConfig
 from .constants import CONFIG_PATH, CONFIG_FONTSIZE_CONTENT, CONFIG_FONTSIZE_HEADER, CONFIG_FONTSIZE_TABLE, CONFIG_COMBOBOX_SHORT, CONFIG_COMBOBOX_LONG, CONFIG_COMBOBOX_MIDEAN
 from .dlconfig_parse_widgets import InpaintConfigPanel, TextDetectConfigPanel, TranslatorConfigPanel, OCRConfigPanel
 
+PIPELINE_MODES = ['thread', 'process']
+PIPELINE_NUM_WORKERS = [2, 4, 8, 16, 32]
+
 class ConfigTextLabel(QLabel):
     def __init__(self, text: str, fontsize: int, font_weight: int = None, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
@@ -296,6 +299,7 @@ class ConfigPanel(Widget):
         label_text_ocr = self.tr('OCR')
         label_inpaint = self.tr('Inpaint')
         label_translator = self.tr('Translator')
+        label_pipeline = self.tr('Pipeline')
         label_startup = self.tr('Startup')
         label_sources = self.tr('Sources')
         label_lettering = self.tr('Lettering')
@@ -306,6 +310,7 @@ class ConfigPanel(Widget):
             TableItem(label_text_ocr, CONFIG_FONTSIZE_TABLE),
             TableItem(label_inpaint, CONFIG_FONTSIZE_TABLE),
             TableItem(label_translator, CONFIG_FONTSIZE_TABLE),
+            TableItem(label_pipeline, CONFIG_FONTSIZE_TABLE),
         ])
         generalTableItem.appendRows([
             TableItem(label_startup, CONFIG_FONTSIZE_TABLE),
@@ -330,6 +335,13 @@ class ConfigPanel(Widget):
         self.trans_config_panel = TranslatorConfigPanel(label_translator)
         self.trans_sub_block = dlConfigPanel.addBlockWidget(self.trans_config_panel)
 
+        dlConfigPanel.addTextLabel(label_pipeline)
+        self.pipeline_mode_combox, pipelineblk = dlConfigPanel.addCombobox([self.tr('threads'), self.tr('processes')], self.tr('execution mode'), 
+                discription=self.tr('Processes mode shards pages across worker processes, only takes effect if both the text detector and inpainter run on cpu.'))
+        self.pipeline_mode_combox.currentIndexChanged.connect(self.on_pipeline_mode_changed)
+        self.num_workers_combox, _ = dlConfigPanel.addCombobox([self.tr('auto')] + [str(n) for n in PIPELINE_NUM_WORKERS], self.tr('workers'), target_block=pipelineblk)
+        self.num_workers_combox.currentIndexChanged.connect(self.on_num_workers_changed)
+
         generalConfigPanel.addTextLabel(label_startup)
         self.open_on_startup_checker = generalConfigPanel.addCheckBox(self.tr('Reopen last project on startup'))
         self.open_on_startup_checker.stateChanged.connect(self.on_open_onstartup_changed)
@@ -446,6 +458,13 @@ class ConfigPanel(Widget):
         self.config.let_fnteffect_flag = self.let_effect_combox.currentIndex()
 
 
+    def on_pipeline_mode_changed(self):
+        self.config.dl.pipeline_mode = PIPELINE_MODES[self.pipeline_mode_combox.currentIndex()]
+
+    def on_num_workers_changed(self):
+        idx = self.num_workers_combox.currentIndex()
+        self.config.dl.num_workers = PIPELINE_NUM_WORKERS[idx - 1] if idx > 0 else 0
+
     def on_source_link_changed(self):
         self.config.src_link_flag = self.src_link_textbox.text()
         self.update_source_download_status.emit(self.config.src_link_flag)
@@ -492,5 +511,11 @@ class ConfigPanel(Widget):
         self.saladict_shortcut.setKeySequence(config.saladict_shortcut)
         self.searchurl_combobox.setCurrentText(config.search_url)
         self.src_link_textbox.setText(config.src_link_flag)
+        if config.dl.pipeline_mode in PIPELINE_MODES:
+            self.pipeline_mode_combox.setCurrentIndex(PIPELINE_MODES.index(config.dl.pipeline_mode))
+        if config.dl.num_workers in PIPELINE_NUM_WORKERS:
+            self.num_workers_combox.setCurrentIndex(PIPELINE_NUM_WORKERS.index(config.dl.num_workers) + 1)
+        else:
+            self.num_workers_combox.setCurrentIndex(0)
 
         self.blockSignals(False)
\ No newline at end of file
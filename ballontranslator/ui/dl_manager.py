@@ -2,15 +2,20 @@ import time
 from typing import Union, List, Dict, Callable
 import numpy as np
 import traceback
+import threading
+from collections import deque
 import os.path as osp
+from functools import partial
 
 from qtpy.QtCore import QThread, Signal, QObject, QLocale
 from qtpy.QtWidgets import QMessageBox
 
 from utils.logger import logger as LOGGER
 from utils.registry import Registry
-from utils.imgproc_utils import enlarge_window
-from dl.translators import MissingTranslatorParams
+from utils.profiler import StageProfiler
+from utils.pipeline import CancelToken, PipelineCancelled
+from utils.imgproc_utils import enlarge_window, dilate_mask
+from dl.translators import MissingTranslatorParams, HedgedTranslator
 from dl import INPAINTERS, TRANSLATORS, TEXTDETECTORS, OCR, \
     VALID_TRANSLATORS, VALID_TEXTDETECTORS, VALID_INPAINTERS, VALID_OCR, \
     TranslatorBase, InpainterBase, TextDetectorBase, OCRBase
@@ -21,6 +26,7 @@ from .stylewidgets import ImgtransProgressMessageBox
 from .configpanel import ConfigPanel
 from .misc import DLModuleConfig, ProgramConfig
 from .imgtrans_proj import ProjImgTrans
+from .imgtrans_pipeline import ImgtransPipeline, attach_translation_cache, merge_config_module_params
 
 from dl.textdetector import TextBlock
 
@@ -33,14 +39,33 @@ class ModuleThread(QThread):
     def __init__(self, dl_config: DLModuleConfig, module_key: str, MODULE_REGISTER: Registry, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.dl_config = dl_config
-        self.job = None
         self.module: Union[TextDetectorBase, TranslatorBase, InpainterBase, OCRBase] = None
         self.module_register = MODULE_REGISTER
         self.module_key = module_key
 
-        self.pipeline_pagekey_queue = []
-        self.finished_counter = 0
-        self.imgtrans_proj: ProjImgTrans = None
+        # jobs run one after another on this thread, cancel() stops the running job at its next check
+        self.cancel_token = CancelToken()
+        self._jobs = deque()
+        self._job_lock = threading.Lock()
+        self._running_jobs = False
+
+    def runJob(self, job: Callable):
+        with self._job_lock:
+            self._jobs.append(job)
+            if self._running_jobs:
+                return
+            self._running_jobs = True
+        # the thread might be returning from a previous run
+        self.wait()
+        self.start()
+
+    def cancel(self):
+        '''
+        Drop queued jobs and ask the running one to stop, modules are kept loaded
+        '''
+        with self._job_lock:
+            self._jobs.clear()
+        self.cancel_token.cancel()
 
     def _set_module(self, module_name: str):
         old_module = self.module
@@ -59,24 +84,18 @@ class ModuleThread(QThread):
             self.exception_occurred.emit(msg, str(e), traceback.format_exc())
         self.finish_set_module.emit()
 
-    def pipeline_finished(self):
-        if self.imgtrans_proj is None:
-            return True
-        elif self.finished_counter == len(self.imgtrans_proj.pages):
-            return True
-        return False
-
-    def initImgtransPipeline(self, proj: ProjImgTrans):
-        if self.isRunning():
-            self.terminate()
-        self.imgtrans_proj = proj
-        self.finished_counter = 0
-        self.pipeline_pagekey_queue.clear()
-
     def run(self):
-        if self.job is not None:
-            self.job()
-        self.job = None
+        while True:
+            with self._job_lock:
+                if len(self._jobs) == 0:
+                    self._running_jobs = False
+                    return
+                job = self._jobs.popleft()
+            self.cancel_token.reset()
+            try:
+                job()
+            except PipelineCancelled:
+                LOGGER.info(f'{self.module_key} job cancelled')
 
 
 class InpaintThread(ModuleThread):
@@ -91,18 +110,16 @@ class InpaintThread(ModuleThread):
         return self.module
 
     def setInpainter(self, inpainter: str):
-        self.job = lambda : self._set_module(inpainter)
-        self.start()
+        self.runJob(lambda : self._set_module(inpainter))
 
     def inpaint(self, img: np.ndarray, mask: np.ndarray, img_key: str = None, inpaint_rect=None):
-        self.job = lambda : self._inpaint(img, mask, img_key, inpaint_rect)
-        self.start()
+        self.runJob(lambda : self._inpaint(img, mask, img_key, inpaint_rect))
     
     def _inpaint(self, img: np.ndarray, mask: np.ndarray, img_key: str = None, inpaint_rect=None):
         inpaint_dict = {}
         self.inpainting = True
         try:
-            inpainted = self.inpainter.inpaint(img, mask)
+            inpainted = self.inpainter.inpaint(img, mask, cancel_token=self.cancel_token)
             inpaint_dict = {
                 'inpainted': inpainted,
                 'img': img,
@@ -111,6 +128,8 @@ class InpaintThread(ModuleThread):
                 'inpaint_rect': inpaint_rect
             }
             self.finish_inpaint.emit(inpaint_dict)
+        except PipelineCancelled:
+            pass
         except Exception as e:
             self.exception_occurred.emit(self.tr('Inpainting Failed.'), str(e), traceback.format_exc())
             self.inpainting = False
@@ -123,8 +142,7 @@ class TextDetectThread(ModuleThread):
         super().__init__(dl_config, 'textdetector', TEXTDETECTORS, *args, **kwargs)
 
     def setTextDetector(self, textdetector: str):
-        self.job = lambda : self._set_module(textdetector)
-        self.start()
+        self.runJob(lambda : self._set_module(textdetector))
 
     @property
     def textdetector(self) -> TextDetectorBase:
@@ -138,8 +156,7 @@ class OCRThread(ModuleThread):
         super().__init__(dl_config, 'ocr', OCR, *args, **kwargs)
 
     def setOCR(self, ocr: str):
-        self.job = lambda : self._set_module(ocr)
-        self.start()
+        self.runJob(lambda : self._set_module(ocr))
     
     @property
     def ocr(self) -> OCRBase:
@@ -148,11 +165,12 @@ class OCRThread(ModuleThread):
 
 class TranslateThread(ModuleThread):
     finish_translate_page = Signal(str)
-    progress_changed = Signal(int)
 
     def __init__(self, dl_config: DLModuleConfig, *args, **kwargs) -> None:
         super().__init__(dl_config, 'translator', TRANSLATORS, *args, **kwargs)
         self.translator: TranslatorBase = self.module
+        # the composite translator builds its backends with their configured params
+        HedgedTranslator.backend_setup_params = dl_config.translator_setup_params
 
     def _set_translator(self, translator: str):
         
@@ -169,6 +187,7 @@ class TranslateThread(ModuleThread):
                 self.translator = translator_module(source, target, raise_unsupported_lang=False, **setup_params)
             else:
                 self.translator = translator_module(source, target, raise_unsupported_lang=False)
+            attach_translation_cache(self.translator, self.dl_config)
             self.dl_config.translate_source = self.translator.lang_source
             self.dl_config.translate_target = self.translator.lang_target
             self.dl_config.translator = self.translator.name
@@ -185,13 +204,19 @@ class TranslateThread(ModuleThread):
         if translator in ['Sugoi']:
             self._set_translator(translator)
         else:
-            self.job = lambda : self._set_translator(translator)
-            self.start()
+            self.runJob(lambda : self._set_translator(translator))
 
     def _translate_page(self, page_dict, page_key: str, raise_exception=False, emit_finished=True):
         page = page_dict[page_key]
+        # requests, rate limiting & retry backoff stop waiting once the job is cancelled
+        translator_cancel_token = self.translator.cancel_token
+        self.translator.cancel_token = self.cancel_token
         try:
-            self.translator.translate_textblk_lst(page)
+            # only blocks whose source text changed since they were translated, unless the cache is bypassed
+            self.translator.translate_textblk_lst(page, only_changed=not self.translator.bypass_cache)
+        except PipelineCancelled as e:
+            # the page is left as it was, ModuleThread.run logs the cancellation
+            raise e
         except MissingTranslatorParams as e:
             if raise_exception:
                 raise e
@@ -202,54 +227,13 @@ class TranslateThread(ModuleThread):
                 raise e
             else:
                 self.exception_occurred.emit(self.tr('Translation Failed.'), repr(e), traceback.format_exc())
+        finally:
+            self.translator.cancel_token = translator_cancel_token
         if emit_finished:
             self.finish_translate_page.emit(page_key)
 
     def translatePage(self, page_dict, page_key: str):
-        self.job = lambda: self._translate_page(page_dict, page_key)
-        self.start()
-
-    def push_pagekey_queue(self, page_key: str):
-        self.pipeline_pagekey_queue.append(page_key)
-
-    def runTranslatePipeline(self, imgtrans_proj: ProjImgTrans):
-        self.initImgtransPipeline(imgtrans_proj)
-        self.job = self._run_translate_pipeline
-        self.start()
-
-    def _run_translate_pipeline(self):
-        num_pages = len(self.imgtrans_proj.pages)
-        delay = self.translator.delay()
-
-        while not self.pipeline_finished():
-            if len(self.pipeline_pagekey_queue) == 0:
-                time.sleep(0.1)
-                continue
-            
-            page_key = self.pipeline_pagekey_queue.pop(0)
-            self.blockSignals(True)
-            try:
-                self._translate_page(self.imgtrans_proj.pages, page_key, raise_exception=True, emit_finished=False)
-            except Exception as e:
-                
-                # TODO: allowing retry/skip/terminate
-
-                msg = self.tr('Translation Failed.')
-                if isinstance(e, MissingTranslatorParams):
-                    msg = msg + '\n' + str(e) + self.tr(' is required for ' + self.translator.name)
-                    
-                self.blockSignals(False)
-                self.exception_occurred.emit(msg, repr(e), traceback.format_exc())
-                self.imgtrans_proj = None
-                self.finished_counter = 0
-                self.pipeline_pagekey_queue = []
-                return
-            self.blockSignals(False)
-            self.finished_counter += 1
-            self.progress_changed.emit(self.finished_counter)
-
-            if not self.pipeline_finished() and delay > 0:
-                time.sleep(delay)
+        self.runJob(lambda: self._translate_page(page_dict, page_key))
 
 
 class ImgtransThread(QThread):
@@ -262,6 +246,7 @@ class ImgtransThread(QThread):
     exception_occurred = Signal(str, str)
 
     finish_blktrans_stage = Signal(str, int)
+    pipeline_cancelled = Signal()
 
     def __init__(self, 
                  dl_config: DLModuleConfig, 
@@ -276,9 +261,16 @@ class ImgtransThread(QThread):
         self.ocr_thread = ocr_thread
         self.translate_thread = translate_thread
         self.inpaint_thread = inpaint_thread
-        self.job = None
         self.imgtrans_proj: ProjImgTrans = None
-        self.mask_postprocess = None
+        self.get_mask_dilate_ksize: Callable = None
+        self.pipeline_queue_size = 2
+        self.pipeline: ImgtransPipeline = None
+
+        # a run started while a cancelled one is winding down is queued behind it on this thread
+        self.cancel_token = CancelToken()
+        self._jobs = deque()
+        self._job_lock = threading.Lock()
+        self._running_jobs = False
 
     @property
     def textdetector(self) -> TextDetectorBase:
@@ -296,26 +288,52 @@ class ImgtransThread(QThread):
     def inpainter(self) -> InpainterBase:
         return self.inpaint_thread.inpainter
 
-    def runImgtransPipeline(self, imgtrans_proj: ProjImgTrans):
-        self.imgtrans_proj = imgtrans_proj
-        self.job = self._imgtrans_pipeline
+    def runJob(self, job: Callable):
+        with self._job_lock:
+            self._jobs.append(job)
+            if self._running_jobs:
+                return
+            self._running_jobs = True
+        # the thread might be returning from a previous run
+        self.wait()
         self.start()
 
+    def hasQueuedJobs(self) -> bool:
+        with self._job_lock:
+            return len(self._jobs) > 0
+
+    def runImgtransPipeline(self, imgtrans_proj: ProjImgTrans, resume: bool = False):
+        self.runJob(lambda : self._imgtrans_pipeline(imgtrans_proj, resume))
+
     def runBlktransPipeline(self, blk_list: List[TextBlock], tgt_img: np.ndarray, mode: int):
-        self.job = lambda : self._blktrans_pipeline(blk_list, tgt_img, mode)
-        self.start()
+        self.runJob(lambda : self._blktrans_pipeline(blk_list, tgt_img, mode))
+
+    def cancel(self):
+        with self._job_lock:
+            self._jobs.clear()
+        self.cancel_token.cancel()
 
     def _blktrans_pipeline(self, blk_list: List[TextBlock], tgt_img: np.ndarray, mode: int):
+        try:
+            self._run_blktrans_pipeline(blk_list, tgt_img, mode)
+        except PipelineCancelled:
+            # a queued run replaces the cancelled one, keep its progress box
+            if not self.hasQueuedJobs():
+                self.pipeline_cancelled.emit()
+
+    def _run_blktrans_pipeline(self, blk_list: List[TextBlock], tgt_img: np.ndarray, mode: int):
         if mode >= 0:
             self.ocr_thread.module.run_ocr(tgt_img, blk_list)
             self.finish_blktrans_stage.emit('ocr', 100)
         if mode != 0:
+            self.cancel_token.check()
             self.translate_thread.module.translate_textblk_lst(blk_list)
             self.finish_blktrans_stage.emit('translate', 100)
         if mode > 1:
             im_h, im_w = tgt_img.shape[:2]
             progress_prod = 100. / len(blk_list) if len(blk_list) > 0 else 0
             for ii, blk in enumerate(blk_list):
+                self.cancel_token.check()
                 xyxy = enlarge_window(blk.xyxy, im_w, im_h)
                 xyxy = np.array(xyxy)
                 x1, y1, x2, y2 = xyxy.astype(np.int64)
@@ -331,57 +349,60 @@ class ImgtransThread(QThread):
                     self.finish_blktrans_stage.emit('inpaint', int((ii+1) * progress_prod))
         self.finish_blktrans_stage.emit(str(mode), 0)
 
-    def _imgtrans_pipeline(self):
+    def _imgtrans_pipeline(self, imgtrans_proj: ProjImgTrans, resume: bool = False):
+        self.imgtrans_proj = imgtrans_proj
         self.detect_counter = 0
         self.ocr_counter = 0
         self.translate_counter = 0
         self.inpaint_counter = 0
-        self.num_pages = num_pages = len(self.imgtrans_proj.pages)
+        self.num_pages = len(self.imgtrans_proj.pages)
+
+        # a partial of a module level function so it can be shipped to worker processes
+        mask_postprocess = None
+        if self.get_mask_dilate_ksize is not None:
+            mask_postprocess = partial(dilate_mask, ksize=self.get_mask_dilate_ksize())
+        self.pipeline = pipeline = ImgtransPipeline(self.dl_config, self.textdetector, self.ocr, self.translator, self.inpainter,
+                                    queue_size=self.pipeline_queue_size,
+                                    mask_postprocess=mask_postprocess,
+                                    on_progress=self.on_pipeline_progress,
+                                    on_exception=self.on_pipeline_exception)
+        try:
+            pipeline.run(self.imgtrans_proj, resume=resume, cancel_token=self.cancel_token)
+        except PipelineCancelled:
+            LOGGER.info('Image translation cancelled')
+            if not self.hasQueuedJobs():
+                self.pipeline_cancelled.emit()
+        except Exception as e:
+            LOGGER.error(traceback.format_exc())
+            self.exception_occurred.emit(self.tr('Image translation failed at stage ') + str(pipeline.failed_stage), repr(e))
+
+    def on_pipeline_progress(self, stage: str, counter: int):
+        if stage == 'detect':
+            self.detect_counter = counter
+            self.update_detect_progress.emit(counter)
+        elif stage == 'ocr':
+            self.ocr_counter = counter
+            self.update_ocr_progress.emit(counter)
+        elif stage == 'translate':
+            self.translate_counter = counter
+            self.update_translate_progress.emit(counter)
+        elif stage == 'inpaint':
+            self.inpaint_counter = counter
+            self.update_inpaint_progress.emit(counter)
+
+    def on_pipeline_exception(self, stage: str, e: Exception):
+        if stage == 'translate':
+            self.update_translate_progress.emit(self.num_pages)
+            self.exception_occurred.emit(self.tr('Translation Failed.'), repr(e))
+
+    def page_text_reused(self, page_index: int) -> bool:
+        '''
+        True if detection, ocr and translation of the page were skipped by a resumed run
+        '''
+        if self.pipeline is None or page_index < 0:
+            return False
+        return self.imgtrans_proj.idx2pagename(page_index) in self.pipeline.text_reused
 
-        if self.translator is not None:
-            self.parallel_trans = not self.translator.is_computational_intensive()
-        else:
-            self.parallel_trans = False
-        if self.dl_config.enable_translate and self.parallel_trans:
-            self.translate_thread.runTranslatePipeline(self.imgtrans_proj)
-
-        for imgname in self.imgtrans_proj.pages:
-            img = self.imgtrans_proj.read_img(imgname)
-
-            mask, blk_list = self.textdetector.detect(img)
-            if self.mask_postprocess is not None:
-                mask = self.mask_postprocess(mask)
-                
-            self.imgtrans_proj.save_mask(imgname, mask)
-
-            self.detect_counter += 1
-            self.update_detect_progress.emit(self.detect_counter)
-            self.imgtrans_proj.pages[imgname] = blk_list
-
-            if self.dl_config.enable_ocr:
-                self.ocr.run_ocr(img, blk_list)
-                self.ocr_counter += 1
-                self.update_ocr_progress.emit(self.ocr_counter)
-
-                if self.dl_config.enable_translate:
-                    try:
-                        if self.parallel_trans:
-                            self.translate_thread.push_pagekey_queue(imgname)
-                        else:
-                            self.translator.translate_textblk_lst(blk_list)
-                            self.translate_counter += 1
-                            self.update_translate_progress.emit(self.translate_counter)
-                    except Exception as e:
-                        self.dl_config.enable_translate = False
-                        self.update_translate_progress.emit(num_pages)
-                        self.exception_occurred.emit(self.tr('Translation Failed.'), repr(e))
-                        
-            if self.dl_config.enable_inpaint:
-                inpainted = self.inpainter.inpaint(img, mask, blk_list)
-                self.imgtrans_proj.save_inpainted(imgname, inpainted)
-                self.inpaint_counter += 1
-                self.update_inpaint_progress.emit(self.inpaint_counter)
-        
     def detect_finished(self) -> bool:
         if self.imgtrans_proj is None:
             return True
@@ -397,8 +418,6 @@ class ImgtransThread(QThread):
             or not self.dl_config.enable_ocr \
             or not self.dl_config.enable_translate:
             return True
-        if self.parallel_trans:
-            return self.translate_thread.pipeline_finished()
         return self.translate_counter == self.num_pages
 
     def inpaint_finished(self) -> bool:
@@ -407,20 +426,22 @@ class ImgtransThread(QThread):
         return self.inpaint_counter == self.num_pages
 
     def run(self):
-        if self.job is not None:
-            self.job()
-        self.job = None
+        while True:
+            with self._job_lock:
+                if len(self._jobs) == 0:
+                    self._running_jobs = False
+                    return
+                job = self._jobs.popleft()
+            self.cancel_token.reset()
+            job()
 
     def recent_finished_index(self, ref_counter=None) -> int:
         counter = self.detect_counter
         if self.dl_config.enable_ocr:
             counter = min(counter, self.ocr_counter)
             if self.dl_config.enable_translate:
-                if self.parallel_trans:
-                    counter = min(counter, self.translate_thread.finished_counter)
-                else:
-                    counter = min(counter, self.translate_counter)
-                    
+                counter = min(counter, self.translate_counter)
+
         if self.dl_config.enable_inpaint:
             counter = min(counter, self.inpaint_counter)
         
@@ -428,25 +449,6 @@ class ImgtransThread(QThread):
             return min(counter, ref_counter) - 1
         return counter - 1
 
-def merge_config_module_params(config_params: Dict, module_keys: List, get_module: Callable) -> Dict:
-    for module_key in module_keys:
-        module_params = get_module(module_key).setup_params
-        if module_key not in config_params or config_params[module_key] is None:
-            config_params[module_key] = module_params
-        else:
-            cfg_param = config_params[module_key]
-            cfg_key_set = set(cfg_param.keys())
-            module_key_set = set(module_params.keys())
-            for ck in cfg_key_set:
-                if ck not in module_key_set:
-                    LOGGER.warning(f'Found invalid {module_key} config: {ck}')
-                    cfg_param.pop(ck)
-            for mk in module_key_set:
-                if mk not in cfg_key_set:
-                    LOGGER.info(f'Found new {module_key} config: {mk}')
-                    cfg_param[mk] = module_params[mk]
-    return config_params
-
 class DLManager(QObject):
     imgtrans_proj: ProjImgTrans = None
 
@@ -481,7 +483,6 @@ class DLManager(QObject):
         self.ocr_thread.exception_occurred.connect(self.handleRunTimeException)
 
         self.translate_thread = TranslateThread(dl_config)
-        self.translate_thread.progress_changed.connect(self.on_update_translate_progress)
         self.translate_thread.finish_set_module.connect(self.on_finish_settranslator)
         self.translate_thread.finish_translate_page.connect(self.on_finish_translate_page)
         self.translate_thread.exception_occurred.connect(self.handleRunTimeException)        
@@ -500,6 +501,9 @@ class DLManager(QObject):
         self.imgtrans_thread.update_inpaint_progress.connect(self.on_update_inpaint_progress)
         self.imgtrans_thread.exception_occurred.connect(self.handleRunTimeException)
         self.imgtrans_thread.finish_blktrans_stage.connect(self.on_finish_blktrans_stage)
+        self.imgtrans_thread.pipeline_cancelled.connect(self.on_imgtrans_cancelled)
+        self.progress_msgbox.pause_toggled.connect(self.pauseImgtransPipeline)
+        self.progress_msgbox.cancel_clicked.connect(self.cancelImgtransPipeline)
 
         self.translator_panel = translator_panel = config_panel.trans_config_panel        
         translator_setup_params = merge_config_module_params(dl_config.translator_setup_params, VALID_TRANSLATORS, TRANSLATORS.get)
@@ -558,9 +562,11 @@ class DLManager(QObject):
     def translatePage(self, run_target: bool, page_key: str):
         if not run_target:
             if self.translate_thread.isRunning():
-                LOGGER.warning('Terminating a running translation thread.')
-                self.translate_thread.terminate()
+                LOGGER.warning('Cancelling a running translation thread.')
+                self.translate_thread.cancel()
             return
+        if self.translator is not None:
+            self.translator.bypass_cache = self.imgtrans_proj.bypass_translation_cache
         self.translate_thread.translatePage(self.imgtrans_proj.pages, page_key)
 
     def inpainterBusy(self):
@@ -572,23 +578,54 @@ class DLManager(QObject):
             return
         self.inpaint_thread.inpaint(img, mask, img_key, inpaint_rect)
 
-    def terminateRunningThread(self):
-        if self.textdetect_thread.isRunning():
-            self.textdetect_thread.terminate()
-        if self.ocr_thread.isRunning():
-            self.ocr_thread.terminate()
-        if self.inpaint_thread.isRunning():
-            self.inpaint_thread.terminate()
-        if self.translate_thread.isRunning():
-            self.translate_thread.terminate()
+    def cancelRunningThread(self):
+        '''
+        Ask running jobs to stop at their next check without waiting for them, loaded models are kept.
+        Jobs started afterwards are queued behind the cancelled ones on their threads.
+        '''
+        for thread in [self.textdetect_thread, self.ocr_thread, self.inpaint_thread, self.translate_thread, self.imgtrans_thread]:
+            if thread.isRunning():
+                thread.cancel()
+
+    def pauseImgtransPipeline(self, pause: bool = True):
+        if pause:
+            self.imgtrans_thread.cancel_token.pause()
+        else:
+            self.imgtrans_thread.cancel_token.resume()
 
-    def runImgtransPipeline(self):
+    def cancelImgtransPipeline(self):
+        self.imgtrans_thread.cancel()
+
+    def on_imgtrans_cancelled(self):
+        self.progress_msgbox.hide()
+        if self.imgtrans_proj is not None and not self.imgtrans_proj.is_empty:
+            self.imgtrans_proj.save()
+        self.imgtrans_pipeline_finished.emit()
+
+    def pipelineProfile(self) -> StageProfiler:
+        '''
+        per page & stage timings of the last image translation run, None if there is none
+        '''
+        pipeline = self.imgtrans_thread.pipeline
+        return pipeline.profiler if pipeline is not None else None
+
+    def dumpPipelineProfile(self, profile_dir: str) -> bool:
+        pipeline = self.imgtrans_thread.pipeline
+        if pipeline is None:
+            return False
+        pipeline.dump_profile(profile_dir)
+        return True
+
+    def runImgtransPipeline(self, resume: bool = False):
+        '''
+        resume: continue an unfinished run, stages which finished with current modules & params are skipped
+        '''
         if self.imgtrans_proj.is_empty:
             LOGGER.info('proj file is empty, nothing to do')
             self.progress_msgbox.hide()
             return
         self.last_finished_index = -1
-        self.terminateRunningThread()
+        self.cancelRunningThread()
         
         self.progress_msgbox.show_all_bars()
         if not self.dl_config.enable_ocr:
@@ -602,10 +639,10 @@ class DLManager(QObject):
                 self.progress_msgbox.translate_bar.show()
         self.progress_msgbox.zero_progress()
         self.progress_msgbox.show()
-        self.imgtrans_thread.runImgtransPipeline(self.imgtrans_proj)
+        self.imgtrans_thread.runImgtransPipeline(self.imgtrans_proj, resume)
 
     def runBlktransPipeline(self, blk_list: List[TextBlock], tgt_img: np.ndarray, mode: int):
-        self.terminateRunningThread()
+        self.cancelRunningThread()
         self.progress_msgbox.hide_all_bars()
         if mode >= 0:
             self.progress_msgbox.ocr_bar.show()
@@ -634,9 +671,7 @@ class DLManager(QObject):
         ri = self.imgtrans_thread.recent_finished_index(progress)
         progress = int(progress / self.imgtrans_thread.num_pages * 100)
         self.progress_msgbox.updateDetectProgress(progress)
-        if ri != self.last_finished_index:
-            self.last_finished_index = ri
-            self.page_trans_finished.emit(ri)
+        self.emitPageFinished(ri)
         if progress == 100:
             self.finishImgtransPipeline()
 
@@ -644,9 +679,7 @@ class DLManager(QObject):
         ri = self.imgtrans_thread.recent_finished_index(progress)
         progress = int(progress / self.imgtrans_thread.num_pages * 100)
         self.progress_msgbox.updateOCRProgress(progress)
-        if ri != self.last_finished_index:
-            self.last_finished_index = ri
-            self.page_trans_finished.emit(ri)
+        self.emitPageFinished(ri)
         if progress == 100:
             self.finishImgtransPipeline()
 
@@ -654,9 +687,7 @@ class DLManager(QObject):
         ri = self.imgtrans_thread.recent_finished_index(progress)
         progress = int(progress / self.imgtrans_thread.num_pages * 100)
         self.progress_msgbox.updateTranslateProgress(progress)
-        if ri != self.last_finished_index:
-            self.last_finished_index = ri
-            self.page_trans_finished.emit(ri)
+        self.emitPageFinished(ri)
         if progress == 100:
             self.finishImgtransPipeline()
 
@@ -664,12 +695,17 @@ class DLManager(QObject):
         ri = self.imgtrans_thread.recent_finished_index(progress)
         progress = int(progress / self.imgtrans_thread.num_pages * 100)
         self.progress_msgbox.updateInpaintProgress(progress)
-        if ri != self.last_finished_index:
-            self.last_finished_index = ri
-            self.page_trans_finished.emit(ri)
+        self.emitPageFinished(ri)
         if progress == 100:
             self.finishImgtransPipeline()
 
+    def emitPageFinished(self, page_index: int):
+        if page_index != self.last_finished_index:
+            self.last_finished_index = page_index
+            # pages kept from a previous run are already postprocessed
+            if not self.imgtrans_thread.page_text_reused(page_index):
+                self.page_trans_finished.emit(page_index)
+
     def finishImgtransPipeline(self):
         if self.imgtrans_thread.detect_finished() \
             and self.imgtrans_thread.ocr_finished() \
@@ -684,8 +720,8 @@ class DLManager(QObject):
         if translator is None:
             translator = self.dl_config.translator
         if self.translate_thread.isRunning():
-            LOGGER.warning('Terminating a running translation thread.')
-            self.translate_thread.terminate()
+            LOGGER.warning('Cancelling a running translation thread.')
+            self.translate_thread.cancel()
         self.update_translator_status.emit('...', self.dl_config.translate_source, self.dl_config.translate_target)
         self.translate_thread.setTranslator(translator)
 
@@ -693,24 +729,24 @@ class DLManager(QObject):
         if inpainter is None:
             inpainter =self.dl_config.inpainter
         if self.inpaint_thread.isRunning():
-            LOGGER.warning('Terminating a running inpaint thread.')
-            self.inpaint_thread.terminate()
+            LOGGER.warning('Cancelling a running inpaint thread.')
+            self.inpaint_thread.cancel()
         self.inpaint_thread.setInpainter(inpainter)
 
     def setTextDetector(self, textdetector: str = None):
         if textdetector is None:
             textdetector = self.dl_config.textdetector
         if self.textdetect_thread.isRunning():
-            LOGGER.warning('Terminating a running text detection thread.')
-            self.textdetect_thread.terminate()
+            LOGGER.warning('Cancelling a running text detection thread.')
+            self.textdetect_thread.cancel()
         self.textdetect_thread.setTextDetector(textdetector)
 
     def setOCR(self, ocr: str = None):
         if ocr is None:
             ocr = self.dl_config.ocr
         if self.ocr_thread.isRunning():
-            LOGGER.warning('Terminating a running OCR thread.')
-            self.ocr_thread.terminate()
+            LOGGER.warning('Cancelling a running OCR thread.')
+            self.ocr_thread.cancel()
         self.ocr_thread.setOCR(ocr)
 
     def on_finish_setdetector(self):
@@ -832,7 +868,7 @@ class DLManager(QObject):
         if not self.imgtrans_thread.isRunning():
             if self.inpaint_thread.inpainting:
                 self.run_canvas_inpaint = False
-                self.inpaint_thread.terminate()
+                self.inpaint_thread.cancel()
 
     def on_inpainter_checker_changed(self, is_checked: bool):
         self.dl_config.check_need_inpaint = is_checked
@@ -6,7 +6,7 @@ from typing import Union, Tuple, List
 import numpy as np
 import cv2
 
-from utils.imgproc_utils import enlarge_window
+from utils.imgproc_utils import enlarge_window, dilate_mask
 from utils.textblock_mask import canny_flood, connected_canny_flood
 from utils.logger import logger
 
@@ -254,11 +254,7 @@ class RectPanel(Widget):
         return self.autoChecker.isChecked()
 
     def post_process_mask(self, mask: np.ndarray) -> np.ndarray:
-        ksize = self.dilate_slider.value()
-        if ksize == 0:
-            return mask
-        element = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * ksize + 1, 2 * ksize + 1),(ksize, ksize))
-        return cv2.dilate(mask, element)
+        return dilate_mask(mask, self.dilate_slider.value())
 
 
 class DrawingPanel(Widget):
@@ -0,0 +1,628 @@
+import time, os, pickle, json, hashlib, signal
+import cv2
+import os.path as osp
+import threading
+import multiprocessing
+from functools import partial
+from typing import Callable, Dict, List, Tuple, Set
+
+from utils.logger import logger as LOGGER
+from utils.pipeline import StagedPipeline, Prefetcher, CancelToken, PipelineCancelled
+from utils.profiler import StageProfiler
+from utils.io_utils import imread, imwrite, AsyncImgWriter
+from utils.imgproc_utils import dilate_mask
+from dl import TRANSLATORS, TEXTDETECTORS, OCR, INPAINTERS, \
+    VALID_TRANSLATORS, VALID_TEXTDETECTORS, VALID_INPAINTERS, VALID_OCR, \
+    TranslatorBase, InpainterBase, TextDetectorBase, OCRBase, HedgedTranslator
+from dl.translators.cache import open_translation_cache
+
+from .misc import DLModuleConfig
+from .imgtrans_proj import ProjImgTrans
+
+PIPELINE_STAGES = ['detect', 'ocr', 'translate', 'inpaint']
+# stages which have to be rerun once their upstream stage is rerun
+DOWNSTREAM_STAGES = {'detect': ['ocr', 'translate', 'inpaint'], 'ocr': ['translate']}
+# setup params that don't change results, they're left out of stage keys
+RUNTIME_PARAMS = {'device', 'delay', 'concurrency', 'requests_per_sec', 'chars_per_sec', 'max_retries', 
+                  'inter_threads', 'intra_threads', 'max_batch_size', 'backend', 'latency_budget'}
+
+
+def module_signature(module) -> str:
+    if module is None:
+        return ''
+    params = {}
+    if module.setup_params is not None:
+        for key, param in module.setup_params.items():
+            if key in RUNTIME_PARAMS:
+                continue
+            params[key] = param['select'] if isinstance(param, dict) else param
+    return module.name + json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+def callable_signature(func: Callable) -> str:
+    if func is None:
+        return ''
+    if isinstance(func, partial):
+        return func.func.__name__ + json.dumps(func.keywords, sort_keys=True, default=str)
+    return getattr(func, '__name__', func.__class__.__name__)
+
+def stage_key(name: str, *signatures: str) -> str:
+    return name + '@' + hashlib.md5(''.join(signatures).encode('utf-8')).hexdigest()[:16]
+
+
+class ImgtransPipeline:
+    '''
+    Qt-free detect -> ocr -> translate & detect -> inpaint page pipeline,
+    shared by ImgtransThread and the headless batch mode.
+    '''
+
+    def __init__(self,
+                 dl_config: DLModuleConfig,
+                 textdetector: TextDetectorBase,
+                 ocr: OCRBase,
+                 translator: TranslatorBase,
+                 inpainter: InpainterBase,
+                 queue_size: int = 2,
+                 mask_postprocess: Callable = None,
+                 on_progress: Callable = None,
+                 on_exception: Callable = None,
+                 checkpoint_interval: float = 30.) -> None:
+        self.dl_config = dl_config
+        self.textdetector = textdetector
+        self.ocr = ocr
+        self.translator = translator
+        self.inpainter = inpainter
+        self.queue_size = queue_size
+        self.mask_postprocess = mask_postprocess
+        self.on_progress = on_progress          # on_progress(stage: str, counter: int)
+        self.on_exception = on_exception        # on_exception(stage: str, e: Exception)
+        self.checkpoint_interval = checkpoint_interval  # seconds between project saves during a run
+
+        self.imgtrans_proj: ProjImgTrans = None
+        self.num_pages = 0
+        self.counters = {stage: 0 for stage in PIPELINE_STAGES}
+        self.stage_time = {stage: 0. for stage in PIPELINE_STAGES}
+        self.failed_stage: str = None
+        self.stages: List[str] = []
+        self.prefetcher: Prefetcher = None
+        self.stage_keys: Dict[str, str] = {}
+        self.page_todo: Dict[str, List[str]] = {}   # stages to run of every page
+        self.text_reused: Set[str] = set()          # pages whose detect, ocr & translate results were kept
+        self.skipped = {stage: 0 for stage in PIPELINE_STAGES}
+        self._checkpoint_lock = threading.Lock()
+        self._last_checkpoint = 0.
+        self.profiler = StageProfiler()
+        self.cancel_token: CancelToken = None
+
+    def enabled_stages(self) -> List[str]:
+        stages = ['detect']
+        if self.dl_config.enable_ocr:
+            stages.append('ocr')
+            if self.dl_config.enable_translate:
+                stages.append('translate')
+        if self.dl_config.enable_inpaint:
+            stages.append('inpaint')
+        return stages
+
+    def compute_stage_keys(self) -> Dict[str, str]:
+        '''
+        Stage keys identify the module & params a stage ran with, chained with the upstream key,
+        so changing the detector invalidates ocr, translate and inpaint as well.
+        '''
+        keys = {'detect': stage_key(self.textdetector.name, module_signature(self.textdetector), callable_signature(self.mask_postprocess))}
+        if self.ocr is not None:
+            keys['ocr'] = stage_key(self.ocr.name, keys['detect'], module_signature(self.ocr))
+            if self.translator is not None:
+                keys['translate'] = stage_key(self.translator.name, keys['ocr'], module_signature(self.translator), 
+                                              self.translator.lang_source, self.translator.lang_target)
+        if self.inpainter is not None:
+            keys['inpaint'] = stage_key(self.inpainter.name, keys['detect'], module_signature(self.inpainter), 
+                                        str(self.dl_config.check_need_inpaint))
+        return keys
+
+    def page_stage_key(self, imgname: str, stage: str) -> str:
+        # every stage depends on the page content, so the content hash goes into all of them
+        page_hash = self.imgtrans_proj.page_hashes.get(imgname)
+        if page_hash is None:
+            return self.stage_keys[stage]
+        return self.stage_keys[stage] + ':' + page_hash
+
+    def plan(self, resume: bool = False) -> Dict[str, List[str]]:
+        '''
+        Decide stages to run of every page, all enabled stages are run unless resume is set,
+        in which case stages finished with the same stage key are skipped, 
+        stage keys include the page content hash so replaced images get reprocessed.
+        '''
+        proj = self.imgtrans_proj
+        page_todo = {}
+        for imgname in proj.pages:
+            if not resume:
+                todo = set(self.stages)
+            else:
+                todo = {stage for stage in self.stages if not proj.stage_finished(imgname, stage, self.page_stage_key(imgname, stage))}
+                if 'detect' not in todo and 'inpaint' in todo and not osp.exists(proj.get_mask_path(imgname)):
+                    todo.add('detect')
+                for stage in list(todo):
+                    todo.update(DOWNSTREAM_STAGES.get(stage, []))
+                todo.intersection_update(self.stages)
+            page_todo[imgname] = [stage for stage in self.stages if stage in todo]
+            proj.clear_stages(imgname, page_todo[imgname])
+        return page_todo
+
+    def run(self, imgtrans_proj: ProjImgTrans, resume: bool = False, cancel_token: CancelToken = None):
+        '''
+        cancel_token: checked between pages & inpainting blocks, 
+        a cancelled run raises PipelineCancelled and keeps finished stages so it can be resumed
+        '''
+        self.imgtrans_proj = imgtrans_proj
+        self.cancel_token = cancel_token
+        self.num_pages = len(imgtrans_proj.pages)
+        self.counters = {stage: 0 for stage in PIPELINE_STAGES}
+        self.stage_time = {stage: 0. for stage in PIPELINE_STAGES}
+        self.failed_stage = None
+        if self.translator is not None:
+            # retries & rate limiting of the translator wait on the token
+            self.translator.cancel_token = cancel_token
+            self.translator.bypass_cache = imgtrans_proj.bypass_translation_cache
+            # repeated lines of the whole project are translated once
+            self.translator.dedup_memo = {}
+            self.translator.reset_stats()
+        if self.inpainter is not None:
+            self.inpainter.reset_stats()
+
+        self.stages = stages = self.enabled_stages()
+        self.stage_keys = self.compute_stage_keys()
+        changed_pages = imgtrans_proj.update_page_hashes()
+        if resume and changed_pages:
+            LOGGER.info(f'{len(changed_pages)} pages are new or changed')
+        self.page_todo = self.plan(resume)
+        self.skipped = {stage: 0 for stage in PIPELINE_STAGES}
+        self.text_reused = set()
+        for imgname, todo in self.page_todo.items():
+            for stage in stages:
+                if stage not in todo:
+                    self.skipped[stage] += 1
+            if not {'detect', 'ocr', 'translate'}.intersection(todo):
+                self.text_reused.add(imgname)
+        if resume:
+            num_finished = sum(1 for todo in self.page_todo.values() if len(todo) == 0)
+            LOGGER.info(f'Resuming: {num_finished}/{self.num_pages} pages are already finished')
+        self._last_checkpoint = time.time()
+        self.profiler.reset()
+
+        sharded = self.use_process_pool()
+        pipeline = StagedPipeline(self.queue_size, cancel_token=cancel_token)
+        if sharded:
+            # detection & inpainting run in worker processes, results are merged back here
+            on_sharded = [self._finished_callback('detect')]
+            if 'inpaint' in stages:
+                on_sharded.append(self._finished_callback('inpaint'))
+            pipeline.add_stage('detect', self._merge_sharded_page, on_finished=lambda page: [cb(page) for cb in on_sharded])
+        else:
+            pipeline.add_stage('detect', self._timed('detect', self._detect_page), on_finished=self._finished_callback('detect'))
+        if 'ocr' in stages:
+            pipeline.add_stage('ocr', self._timed('ocr', self._ocr_page), upstream='detect', on_finished=self._finished_callback('ocr'))
+        if 'translate' in stages:
+            # keep several requests in flight, results are still handed over in page order
+            concurrency = self.translator.concurrency()
+            if self.translator.batch_enabled():
+                # pack text blocks of several pages into one request
+                pipeline.add_stage('translate', self._timed('translate', self._translate_pages), upstream='ocr', 
+                                   on_finished=self._finished_callback('translate'), batch_fits=self._translate_batch_fits, concurrency=concurrency)
+            else:
+                pipeline.add_stage('translate', self._timed('translate', self._translate_page), upstream='ocr', 
+                                   on_finished=self._finished_callback('translate'), concurrency=concurrency)
+        if 'inpaint' in stages and not sharded:
+            pipeline.add_stage('inpaint', self._timed('inpaint', self._inpaint_page), upstream='detect', on_finished=self._finished_callback('inpaint'))
+
+        # in process mode only ocr needs the decoded page in this process
+        prefetch = not sharded or 'ocr' in stages
+        need_img = {'ocr'} if sharded else {'detect', 'ocr', 'inpaint'}
+        prefetch_keys = [imgname for imgname, todo in self.page_todo.items() if need_img.intersection(todo)]
+        self.prefetcher = Prefetcher(self._read_img, prefetch_keys,
+                                     num_prefetch=int(self.dl_config.num_prefetch) if prefetch else 0,
+                                     max_bytes=int(self.dl_config.prefetch_max_mb) * 1024 ** 2)
+        img_writer = AsyncImgWriter(int(self.dl_config.imwrite_queue_mb) * 1024 ** 2, profiler=self.profiler)
+        imgtrans_proj.img_writer = img_writer
+        try:
+            with self.prefetcher:
+                if sharded:
+                    self._run_sharded(pipeline)
+                else:
+                    pipeline.run(list(imgtrans_proj.pages.keys()))
+            try:
+                img_writer.flush()
+            except Exception:
+                pipeline.failed_stage = 'save'
+                raise
+        except Exception:
+            self.failed_stage = pipeline.failed_stage
+            raise
+        finally:
+            # stages finished before a failure are kept so the run can be resumed
+            self.checkpoint(force=True)
+            if self.translator is not None:
+                self.translator.cancel_token = None
+                self.translator.bypass_cache = False
+                self.translator.dedup_memo = None
+            img_writer.close()
+            imgtrans_proj.img_writer = None
+            LOGGER.debug(self.prefetcher.summary())
+            if self.dl_config.profile_dir:
+                self.dump_profile(self.dl_config.profile_dir)
+
+    def dump_profile(self, profile_dir: str):
+        '''
+        Dump per page & stage timings of the last run as json and csv
+        '''
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            save_prefix = osp.join(profile_dir, self.imgtrans_proj.proj_name() + time.strftime('_%Y%m%d-%H%M%S'))
+            self.profiler.dump_json(save_prefix + '.json')
+            self.profiler.dump_csv(save_prefix + '.csv')
+            LOGGER.info(f'Pipeline profile saved to {save_prefix}.json/csv')
+        except Exception as e:
+            LOGGER.error(f'Failed to save pipeline profile: {repr(e)}')
+
+    def use_process_pool(self) -> bool:
+        if self.dl_config.pipeline_mode != 'process':
+            return False
+        if not self.textdetector.is_cpu_intensive():
+            LOGGER.warning(f'{self.textdetector.name} is not running on cpu, fall back to threaded pipeline')
+            return False
+        if 'inpaint' in self.stages and not self.inpainter.is_cpu_intensive():
+            LOGGER.warning(f'{self.inpainter.name} is not running on cpu, fall back to threaded pipeline')
+            return False
+        return True
+
+    def num_workers(self) -> int:
+        num_workers = int(self.dl_config.num_workers)
+        if num_workers <= 0:
+            num_workers = os.cpu_count() or 1
+        return max(1, min(num_workers, self.num_pages))
+
+    def _run_sharded(self, pipeline: StagedPipeline):
+        num_workers = self.num_workers()
+        threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+        mask_postprocess = self.mask_postprocess
+        if mask_postprocess is not None:
+            try:
+                pickle.dumps(mask_postprocess)
+            except Exception:
+                LOGGER.warning('mask postprocess is not picklable and will be skipped by worker processes')
+                mask_postprocess = None
+
+        inpainter = self.inpainter if 'inpaint' in self.stages else None
+        initargs = (
+            self.textdetector.name, self.textdetector.setup_params,
+            inpainter.name if inpainter is not None else None,
+            inpainter.setup_params if inpainter is not None else None,
+            self.dl_config.check_need_inpaint, mask_postprocess, threads_per_worker
+        )
+        proj = self.imgtrans_proj
+        jobs = []
+        for imgname, todo in self.page_todo.items():
+            run_detect, run_inpaint = 'detect' in todo, 'inpaint' in todo
+            if run_detect or run_inpaint:
+                blk_list = None if run_detect else proj.pages[imgname]
+                jobs.append((imgname, osp.join(proj.directory, imgname), proj.get_mask_path(imgname), proj.get_inpainted_path(imgname), blk_list, run_inpaint))
+
+        def results(pool):
+            # pages which skip both detection & inpainting don't go through worker processes
+            it = pool.imap(_run_shard_page, jobs, chunksize=1)
+            sharded_pages = {job[0] for job in jobs}
+            for imgname in proj.pages:
+                if imgname in sharded_pages:
+                    yield next(it)
+                else:
+                    yield imgname, None, []
+
+        LOGGER.info(f'Sharding {len(jobs)} pages across {num_workers} worker processes')
+        # spawn avoids forking a process which holds Qt & torch threads
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(num_workers, initializer=_init_shard_worker, initargs=initargs) as pool:
+            pipeline.run(results(pool))
+
+    def _merge_sharded_page(self, result: Tuple) -> Dict:
+        imgname, blk_list, records = result
+        # worker records start from perf_counter(), which is system wide
+        self.profiler.extend(records, start_offset=-self.profiler.t0)
+        for record in records:
+            stage = 'inpaint' if record['stage'] == 'inpaint' else 'detect'
+            self.stage_time[stage] += record['wall']
+        if blk_list is not None:
+            self.imgtrans_proj.pages[imgname] = blk_list
+        else:
+            blk_list = self.imgtrans_proj.pages[imgname]
+        img = self.prefetcher.get(imgname) if 'ocr' in self.page_todo[imgname] else None
+        return {'imgname': imgname, 'img': img, 'mask': None, 'blk_list': blk_list}
+
+    def _timed(self, stage: str, func: Callable) -> Callable:
+        def wrapper(page):
+            t0 = time.perf_counter()
+            rst = func(page)
+            self.stage_time[stage] += time.perf_counter() - t0
+            return rst
+        return wrapper
+
+    def _finished_callback(self, stage: str) -> Callable:
+        def callback(page: Dict):
+            if stage == 'translate' and not self.dl_config.enable_translate:
+                return
+            imgname = page['imgname']
+            if stage in self.page_todo[imgname]:
+                with self._checkpoint_lock:
+                    self.imgtrans_proj.set_stage_finished(imgname, stage, self.page_stage_key(imgname, stage))
+                self.checkpoint()
+            self.counters[stage] += 1
+            if self.on_progress is not None:
+                self.on_progress(stage, self.counters[stage])
+        return callback
+
+    def checkpoint(self, force: bool = False):
+        '''
+        Save the project so finished stages survive a crash, 
+        pending writes are flushed first so recorded stages always have their layers on disk.
+        '''
+        if self.imgtrans_proj is None:
+            return
+        with self._checkpoint_lock:
+            if not force and time.time() - self._last_checkpoint < self.checkpoint_interval:
+                return
+            self._last_checkpoint = time.time()
+            try:
+                if self.imgtrans_proj.img_writer is not None:
+                    self.imgtrans_proj.img_writer.flush()
+                self.imgtrans_proj.save()
+            except Exception as e:
+                if not force:
+                    raise
+                LOGGER.error(f'Failed to save project: {repr(e)}')
+
+    def _read_img(self, imgname: str):
+        with self.profiler.profile(imgname, 'read'):
+            return self.imgtrans_proj.read_img(imgname)
+
+    def _detect_page(self, imgname: str) -> Dict:
+        todo = self.page_todo[imgname]
+        if 'detect' not in todo:
+            img = self.prefetcher.get(imgname) if {'ocr', 'inpaint'} & set(todo) else None
+            mask = None
+            if 'inpaint' in todo:
+                with self.profiler.profile(imgname, 'read'):
+                    mask = self.imgtrans_proj.read_mask(imgname)
+            return {'imgname': imgname, 'img': img, 'mask': mask, 'blk_list': self.imgtrans_proj.pages[imgname]}
+        img = self.prefetcher.get(imgname)
+        with self.profiler.profile(imgname, 'detect'):
+            mask, blk_list = self.textdetector.detect(img)
+        if self.mask_postprocess is not None:
+            with self.profiler.profile(imgname, 'mask_refine'):
+                mask = self.mask_postprocess(mask)
+        self.imgtrans_proj.save_mask(imgname, mask)
+        self.imgtrans_proj.pages[imgname] = blk_list
+        return {'imgname': imgname, 'img': img, 'mask': mask, 'blk_list': blk_list}
+
+    def _ocr_page(self, page: Dict):
+        if 'ocr' not in self.page_todo[page['imgname']]:
+            return
+        with self.profiler.profile(page['imgname'], 'ocr'):
+            self.ocr.run_ocr(page['img'], page['blk_list'])
+
+    def _translate_page(self, page: Dict):
+        self._translate_pages([page])
+
+    def _pages_to_translate(self, pages: List[Dict]) -> List[Dict]:
+        if not self.dl_config.enable_translate:
+            return []
+        return [page for page in pages if 'translate' in self.page_todo[page['imgname']]]
+
+    def _translate_batch_fits(self, pages: List[Dict]) -> bool:
+        return self.translator.batch_fits([page['blk_list'] for page in self._pages_to_translate(pages)])
+
+    def _translate_pages(self, pages: List[Dict]):
+        pages_to_translate = self._pages_to_translate(pages)
+        if not pages_to_translate:
+            return
+        imgnames = ','.join([page['imgname'] for page in pages_to_translate])
+        try:
+            with self.profiler.profile(imgnames, 'translate'):
+                # blocks translated from the same source text before are kept unless the cache is bypassed
+                self.translator.translate_textblk_lst_batch([page['blk_list'] for page in pages_to_translate], 
+                                                            only_changed=not self.imgtrans_proj.bypass_translation_cache)
+        except Exception as e:
+            # translation failure shouldn't stop detection & inpainting of remaining pages
+            self.dl_config.enable_translate = False
+            LOGGER.error(f'Translation failed on {imgnames}: {repr(e)}')
+            if self.on_exception is not None:
+                self.on_exception('translate', e)
+            return
+
+    def _inpaint_page(self, page: Dict):
+        if 'inpaint' not in self.page_todo[page['imgname']]:
+            return
+        with self.profiler.profile(page['imgname'], 'inpaint'):
+            inpainted = self.inpainter.inpaint(page['img'], page['mask'], page['blk_list'], cancel_token=self.cancel_token)
+        self.imgtrans_proj.save_inpainted(page['imgname'], inpainted)
+
+    def summary(self) -> str:
+        lines = [f'{self.num_pages} pages in {self.imgtrans_proj.directory if self.imgtrans_proj is not None else ""}']
+        for stage in self.stages:
+            counter = self.counters[stage]
+            cost = self.stage_time[stage]
+            status = 'ok' if counter == self.num_pages else 'failed'
+            num_run = max(counter - self.skipped[stage], 0)
+            avg = cost / num_run if num_run > 0 else 0.
+            skipped = f'  {self.skipped[stage]} skipped' if self.skipped[stage] > 0 else ''
+            lines.append(f'{stage:<10} {counter:>5}/{self.num_pages} pages  {cost:8.2f}s  avg {avg:.2f}s/page  {status}{skipped}')
+        if self.prefetcher is not None:
+            lines.append(self.prefetcher.summary())
+        if 'translate' in self.stages:
+            if self.translator.cache is not None:
+                lines.append(self.translator.cache.summary())
+            if self.translator.stats_summary():
+                lines.append(self.translator.stats_summary())
+        if 'inpaint' in self.stages and self.inpainter.stats_summary():
+            lines.append(self.inpainter.stats_summary())
+        for stage, s in self.profiler.summary().items():
+            lines.append(f'  {stage:<12} {s["count"]:>5} calls  wall {s["avg_wall"]:.3f}s  cpu {s["avg_cpu"]:.3f}s  max rss +{s["max_rss_delta_mb"]:.1f}MB')
+        return '\n'.join(lines)
+
+
+_SHARD_WORKER: Dict = {}
+
+def _init_shard_worker(detector_name: str, detector_params: Dict, 
+                       inpainter_name: str, inpainter_params: Dict,
+                       check_need_inpaint: bool, mask_postprocess: Callable, num_threads: int):
+    import torch
+    cv2.setNumThreads(num_threads)
+    torch.set_num_threads(num_threads)
+    _SHARD_WORKER['textdetector'] = TEXTDETECTORS.module_dict[detector_name](**detector_params)
+    if inpainter_name is not None:
+        InpainterBase.check_need_inpaint = check_need_inpaint
+        _SHARD_WORKER['inpainter'] = INPAINTERS.module_dict[inpainter_name](**inpainter_params)
+    _SHARD_WORKER['mask_postprocess'] = mask_postprocess
+
+def _run_shard_page(job: Tuple) -> Tuple:
+    '''
+    detect if blk_list is None, otherwise reuse the saved mask, 
+    returned blk_list is None if detection is skipped, profile records start from perf_counter().
+    '''
+    imgname, img_path, mask_path, inpainted_path, blk_list, run_inpaint = job
+    profiler = StageProfiler()
+    profiler.t0 = 0.
+    with profiler.profile(imgname, 'read'):
+        img = imread(img_path)
+    detected = blk_list is None
+    if detected:
+        with profiler.profile(imgname, 'detect'):
+            mask, blk_list = _SHARD_WORKER['textdetector'].detect(img)
+        if _SHARD_WORKER['mask_postprocess'] is not None:
+            with profiler.profile(imgname, 'mask_refine'):
+                mask = _SHARD_WORKER['mask_postprocess'](mask)
+        with profiler.profile(imgname, 'save'):
+            imwrite(mask_path, mask)
+    else:
+        with profiler.profile(imgname, 'read'):
+            mask = imread(mask_path, cv2.IMREAD_GRAYSCALE)
+
+    inpainter: InpainterBase = _SHARD_WORKER.get('inpainter')
+    if inpainter is not None and run_inpaint:
+        with profiler.profile(imgname, 'inpaint'):
+            inpainted = inpainter.inpaint(img, mask, blk_list)
+        with profiler.profile(imgname, 'save'):
+            imwrite(inpainted_path, inpainted)
+    return imgname, blk_list if detected else None, profiler.records
+
+
+def attach_translation_cache(translator: TranslatorBase, dl_config: DLModuleConfig):
+    entries = int(dl_config.translation_cache_entries)
+    try:
+        translator.cache = open_translation_cache(max_entries=entries) if entries > 0 else None
+    except Exception as e:
+        translator.cache = None
+        LOGGER.error(f'Failed to open translation cache: {repr(e)}')
+
+def merge_config_module_params(config_params: Dict, module_keys: List, get_module: Callable) -> Dict:
+    for module_key in module_keys:
+        module_params = get_module(module_key).setup_params
+        if module_key not in config_params or config_params[module_key] is None:
+            config_params[module_key] = module_params
+        else:
+            cfg_param = config_params[module_key]
+            cfg_key_set = set(cfg_param.keys())
+            module_key_set = set(module_params.keys())
+            for ck in cfg_key_set:
+                if ck not in module_key_set:
+                    LOGGER.warning(f'Found invalid {module_key} config: {ck}')
+                    cfg_param.pop(ck)
+            for mk in module_key_set:
+                if mk not in cfg_key_set:
+                    LOGGER.info(f'Found new {module_key} config: {mk}')
+                    cfg_param[mk] = module_params[mk]
+    return config_params
+
+
+def load_module(dl_config: DLModuleConfig, module_key: str):
+    '''
+    load a module with the setup params the GUI would use, config params merged with module defaults
+    '''
+    module_name = dl_config[module_key]
+    if module_key == 'textdetector':
+        registry, valid_modules = TEXTDETECTORS, VALID_TEXTDETECTORS
+    elif module_key == 'ocr':
+        registry, valid_modules = OCR, VALID_OCR
+    elif module_key == 'inpainter':
+        registry, valid_modules = INPAINTERS, VALID_INPAINTERS
+    else:
+        registry, valid_modules = TRANSLATORS, VALID_TRANSLATORS
+    params = merge_config_module_params(dl_config.get_setup_params(module_key), valid_modules, registry.get).get(module_name)
+    module_class = registry.module_dict[module_name]
+    if module_key == 'translator':
+        HedgedTranslator.backend_setup_params = dl_config.translator_setup_params
+        if params is not None:
+            translator = module_class(dl_config.translate_source, dl_config.translate_target, **params)
+        else:
+            translator = module_class(dl_config.translate_source, dl_config.translate_target)
+        attach_translation_cache(translator, dl_config)
+        return translator
+    if params is not None:
+        return module_class(**params)
+    return module_class()
+
+
+def run_headless(proj_dir: str, dl_config: DLModuleConfig, queue_size: int = 2, mask_dilate_ksize: int = 0, resume: bool = False) -> bool:
+    '''
+    Run the image translation pipeline on a project without starting the Qt app,
+    returns True if every enabled stage finished.
+    '''
+    proj = ProjImgTrans(proj_dir)
+    if proj.is_empty:
+        LOGGER.info('proj file is empty, nothing to do')
+        return True
+
+    textdetector = load_module(dl_config, 'textdetector')
+    LOGGER.info(f'Text detector set to {textdetector.name}')
+    ocr = translator = inpainter = None
+    if dl_config.enable_ocr:
+        ocr = load_module(dl_config, 'ocr')
+        LOGGER.info(f'OCR set to {ocr.name}')
+        if dl_config.enable_translate:
+            translator = load_module(dl_config, 'translator')
+            LOGGER.info(f'Translator set to {translator.name}: {translator.lang_source} -> {translator.lang_target}')
+    if dl_config.enable_inpaint:
+        inpainter = load_module(dl_config, 'inpainter')
+        InpainterBase.check_need_inpaint = dl_config.check_need_inpaint
+        LOGGER.info(f'Inpainter set to {inpainter.name}')
+
+    def on_progress(stage: str, counter: int):
+        LOGGER.info(f'{stage}: {counter}/{proj.num_pages}')
+
+    mask_postprocess = partial(dilate_mask, ksize=mask_dilate_ksize) if mask_dilate_ksize > 0 else None
+    pipeline = ImgtransPipeline(dl_config, textdetector, ocr, translator, inpainter, queue_size=queue_size,
+                                mask_postprocess=mask_postprocess, on_progress=on_progress)
+    # the first ctrl+c stops the run after current pages & blocks, the project stays resumable
+    cancel_token = CancelToken()
+    def on_sigint(signum, frame):
+        LOGGER.warning('Cancelling, press ctrl+c again to quit immediately')
+        cancel_token.cancel()
+        signal.signal(signal.SIGINT, default_sigint_handler)
+    default_sigint_handler = signal.signal(signal.SIGINT, on_sigint)
+
+    succeed = True
+    t0 = time.perf_counter()
+    try:
+        pipeline.run(proj, resume=resume, cancel_token=cancel_token)
+    except PipelineCancelled:
+        LOGGER.warning('Image translation cancelled, rerun with --resume to continue')
+        succeed = False
+    except Exception:
+        LOGGER.exception(f'Image translation failed at stage {pipeline.failed_stage}')
+        succeed = False
+    finally:
+        signal.signal(signal.SIGINT, default_sigint_handler)
+    proj.save()
+    if 'translate' in pipeline.stages and pipeline.counters['translate'] < pipeline.num_pages:
+        succeed = False
+
+    print(pipeline.summary())
+    print(f'total      {time.perf_counter() - t0:.2f}s')
+    return succeed
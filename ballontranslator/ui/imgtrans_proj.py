@@ -1,4 +1,5 @@
 import os, json, shutil, re, docx, docx2txt, piexif, cv2, time
+from concurrent.futures import ThreadPoolExecutor
 from docx.shared import Inches
 from docx import Document
 import piexif.helper
@@ -7,7 +8,7 @@ import os.path as osp
 from typing import Tuple, Union, List, Dict
 
 from utils.logger import logger as LOGGER
-from utils.io_utils import find_all_imgs, imread, imwrite, NumpyEncoder
+from utils.io_utils import find_all_imgs, imread, imwrite, file_hash, NumpyEncoder, AsyncImgWriter
 from dl.textdetector.textblock import TextBlock
 from .misc import ImgnameNotInProjectException, ProjectLoadFailureException, ProjectDirNotExistException, ProjectNotSupportedException, TextBlkEncoder
 
@@ -38,11 +39,15 @@ class ProjImgTrans:
         self.proj_path: str = None
 
         self.src_download_link: str = ''
+        self.page_stages: Dict[str, Dict[str, str]] = {}    # imgname -> {stage: stage key}, stages finished by the pipeline
+        self.page_hashes: Dict[str, str] = {}               # imgname -> hash of image file content
+        self.bypass_translation_cache = False               # don't reuse cached translations for this project
 
         self.current_img: str = None
         self.img_array: np.ndarray = None
         self.mask_array: np.ndarray = None
         self.inpainted_array: np.ndarray = None
+        self.img_writer: AsyncImgWriter = None     # set during batch runs to write masks & inpainted images behind
         if directory is not None:
             self.load(directory)
 
@@ -89,8 +94,12 @@ class ProjImgTrans:
     def result_dir(self):
         return osp.join(self.directory, 'result')
     
-    def init_properties(self, src_download_link: str = '', **kwargs):
+    def init_properties(self, src_download_link: str = '', page_stages: Dict = None, page_hashes: Dict = None, 
+                        bypass_translation_cache: bool = False, **kwargs):
         self.src_download_link = src_download_link
+        self.bypass_translation_cache = bypass_translation_cache
+        self.page_stages = page_stages if page_stages is not None else {}
+        self.page_hashes = page_hashes if page_hashes is not None else {}
 
     def load_from_dict(self, proj_dict: dict):
         self.set_current_img(None)
@@ -147,6 +156,10 @@ class ProjImgTrans:
             img_path = self.current_img_path()
             mask_path = self.mask_path()
             inpainted_path = self.inpainted_path()
+            img_writer = self.img_writer
+            if img_writer is not None:
+                img_writer.wait(mask_path, raise_exception=False)
+                img_writer.wait(inpainted_path, raise_exception=False)
             self.img_array = imread(img_path)
             im_h, im_w = self.img_array.shape[:2]
             if osp.exists(mask_path):
@@ -199,8 +212,11 @@ class ProjImgTrans:
     def save(self):
         if not osp.exists(self.directory):
             raise ProjectDirNotExistException
-        with open(self.proj_path, "w", encoding="utf-8") as f:
+        # write to a temp file first, so an interrupted save never leaves a broken project file
+        tmp_path = self.proj_path + '.tmp'
+        with open(tmp_path, "w", encoding="utf-8") as f:
             f.write(json.dumps(self.to_dict(), ensure_ascii=False, cls=TextBlkEncoder))
+        os.replace(tmp_path, self.proj_path)
 
     def to_dict(self) -> Dict:
         pages = self.pages.copy()
@@ -209,7 +225,10 @@ class ProjImgTrans:
             'directory': self.directory,
             'pages': pages,
             'current_img': self.current_img,
-            'src_download_link': self.src_download_link
+            'src_download_link': self.src_download_link,
+            'page_stages': self.page_stages,
+            'page_hashes': self.page_hashes,
+            'bypass_translation_cache': self.bypass_translation_cache
         }
 
     def read_img(self, imgname: str) -> np.ndarray:
@@ -217,11 +236,48 @@ class ProjImgTrans:
             raise ImgnameNotInProjectException
         return imread(osp.join(self.directory, imgname))
 
+    def read_mask(self, imgname: str) -> np.ndarray:
+        return imread(self.get_mask_path(imgname), cv2.IMREAD_GRAYSCALE)
+
+    def update_page_hashes(self, num_workers: int = 4) -> List[str]:
+        '''
+        Hash image files of all pages, returns pages whose content changed since last update.
+        '''
+        imgnames = list(self.pages.keys())
+        with ThreadPoolExecutor(num_workers) as executor:
+            hashes = list(executor.map(lambda imgname: file_hash(osp.join(self.directory, imgname)), imgnames))
+        changed = [imgname for imgname, h in zip(imgnames, hashes) if self.page_hashes.get(imgname) != h]
+        page_hashes = {imgname: h for imgname, h in self.page_hashes.items() if imgname in self.not_found_pages}
+        page_hashes.update(zip(imgnames, hashes))
+        self.page_hashes = page_hashes
+        return changed
+
+    def stage_finished(self, imgname: str, stage: str, key: str) -> bool:
+        return self.page_stages.get(imgname, {}).get(stage) == key
+
+    def set_stage_finished(self, imgname: str, stage: str, key: str):
+        # replace instead of updating in place, the dict might be dumped by another thread
+        stages = {**self.page_stages.get(imgname, {}), stage: key}
+        self.page_stages = {**self.page_stages, imgname: stages}
+
+    def clear_stages(self, imgname: str, stages: List[str]):
+        finished = {k: v for k, v in self.page_stages.get(imgname, {}).items() if k not in stages}
+        self.page_stages = {**self.page_stages, imgname: finished}
+
     def save_mask(self, img_name, mask: np.ndarray):
-        imwrite(self.get_mask_path(img_name), mask)
+        img_writer = self.img_writer
+        if img_writer is not None:
+            # inpainters clear the mask in place
+            img_writer.write(self.get_mask_path(img_name), mask, copy=True, page=img_name)
+        else:
+            imwrite(self.get_mask_path(img_name), mask)
 
     def save_inpainted(self, img_name, inpainted: np.ndarray):
-        imwrite(self.get_inpainted_path(img_name), inpainted)
+        img_writer = self.img_writer
+        if img_writer is not None:
+            img_writer.write(self.get_inpainted_path(img_name), inpainted, page=img_name)
+        else:
+            imwrite(self.get_inpainted_path(img_name), inpainted)
 
     def current_img_path(self) -> str:
         if self.current_img is None:
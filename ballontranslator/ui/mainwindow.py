@@ -240,7 +240,7 @@ class MainWindow(FramelessWindow):
         dl_manager.page_trans_finished.connect(self.on_pagtrans_finished)
         dl_manager.setupThread(self.configPanel, self.imgtrans_progress_msgbox, self.ocr_postprocess, self.translate_postprocess)
         dl_manager.progress_msgbox.showed.connect(self.on_imgtrans_progressbox_showed)
-        dl_manager.imgtrans_thread.mask_postprocess = self.drawingPanel.rectPanel.post_process_mask
+        dl_manager.imgtrans_thread.get_mask_dilate_ksize = self.drawingPanel.rectPanel.dilate_slider.value
         dl_manager.blktrans_pipeline_finished.connect(self.on_blktrans_finished)
         dl_manager.imgtrans_thread.get_maskseg_method = self.drawingPanel.rectPanel.get_maskseg_method
         dl_manager.imgtrans_thread.post_process_mask = self.drawingPanel.rectPanel.post_process_mask
@@ -355,6 +355,7 @@ class MainWindow(FramelessWindow):
             self.dl_manager.handleRunTimeException(self.tr('Failed to load project ') + json_path, '')
         
     def updatePageList(self):
+        self.titleBar.bypassCacheAction.setChecked(self.imgtrans_proj.bypass_translation_cache)
         if self.pageList.count() != 0:
             self.pageList.clear()
         if len(self.imgtrans_proj.pages) >= C.PAGELIST_THUMBNAIL_MAXNUM:
@@ -446,6 +447,8 @@ class MainWindow(FramelessWindow):
         self.titleBar.replaceMTkeyword_trigger.connect(self.show_MT_keyword_window)
         self.titleBar.replaceOCRkeyword_trigger.connect(self.show_OCR_keyword_window)
         self.titleBar.run_trigger.connect(self.leftBar.runImgtransBtn.click)
+        self.titleBar.continue_trigger.connect(self.on_continue_imgtrans)
+        self.titleBar.bypass_cache_trigger.connect(self.on_bypass_cache_triggered)
         self.titleBar.translate_page_trigger.connect(self.bottomBar.transTranspageBtn.click)
         self.titleBar.fontstyle_trigger.connect(self.show_fontstyle_presets)
         self.titleBar.darkmode_trigger.connect(self.on_darkmode_triggered)
@@ -935,11 +938,18 @@ class MainWindow(FramelessWindow):
             return
         self.close()
 
-    def on_run_imgtrans(self):
+    def on_run_imgtrans(self, resume: bool = False):
         if self.bottomBar.textblockChecker.isChecked():
             self.bottomBar.textblockChecker.click()
         self.postprocess_mt_toggle = False
-        self.dl_manager.runImgtransPipeline()
+        self.dl_manager.runImgtransPipeline(resume)
+
+    def on_continue_imgtrans(self):
+        self.on_run_imgtrans(resume=True)
+
+    def on_bypass_cache_triggered(self, checked: bool):
+        # saved with the project
+        self.imgtrans_proj.bypass_translation_cache = checked
 
     def on_run_sync_source(self):
         self.source_download_msgbox.show_all_bars()
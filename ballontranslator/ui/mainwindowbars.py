@@ -390,13 +390,21 @@ class TitleBar(Widget):
         self.runToolBtn = TitleBarToolBtn(self)
         self.runToolBtn.setText(self.tr('Run'))
         runAction = QAction(self.tr('Run'), self)
+        continueAction = QAction(self.tr('Continue unfinished'), self)
         translatePageAction = QAction(self.tr('Translate page'), self)
+        self.bypassCacheAction = QAction(self.tr('Bypass translation cache'), self)
+        self.bypassCacheAction.setCheckable(True)
+        self.bypassCacheAction.setToolTip(self.tr('Retranslate every text block, including those whose source text is unchanged'))
         runMenu = QMenu(self.runToolBtn)
-        runMenu.addActions([runAction, translatePageAction])
+        runMenu.addActions([runAction, continueAction, translatePageAction])
+        runMenu.addSeparator()
+        runMenu.addAction(self.bypassCacheAction)
         self.runToolBtn.setMenu(runMenu)
         self.runToolBtn.setPopupMode(QToolButton.InstantPopup)
         self.run_trigger = runAction.triggered
+        self.continue_trigger = continueAction.triggered
         self.translate_page_trigger = translatePageAction.triggered
+        self.bypass_cache_trigger = self.bypassCacheAction.triggered
 
         self.iconLabel = QLabel(self)
         self.iconLabel.setFixedWidth(LEFTBAR_WIDTH - 12)
@@ -164,7 +164,14 @@ class DLModuleConfig:
                  inpainter_setup_params = None,
                  translate_source = '日本語',
                  translate_target = '简体中文',
-                 check_need_inpaint = True
+                 check_need_inpaint = True,
+                 pipeline_mode = 'thread',
+                 num_workers = 0,
+                 num_prefetch = 2,
+                 prefetch_max_mb = 1024,
+                 imwrite_queue_mb = 512,
+                 profile_dir = '',
+                 translation_cache_entries = 100000
                  ) -> None:
         self.textdetector = textdetector
         self.ocr = ocr
@@ -196,6 +203,13 @@ class DLModuleConfig:
         self.translate_source = translate_source
         self.translate_target = translate_target
         self.check_need_inpaint = check_need_inpaint
+        self.pipeline_mode = pipeline_mode      # 'thread' or 'process'
+        self.num_workers = num_workers          # worker processes of 'process' mode, 0 for cpu count
+        self.num_prefetch = num_prefetch        # pages decoded ahead of the pipeline
+        self.prefetch_max_mb = prefetch_max_mb  # memory cap of prefetched pages
+        self.imwrite_queue_mb = imwrite_queue_mb    # memory cap of masks & inpainted images waiting to be written
+        self.profile_dir = profile_dir          # dump per page & stage timings of every run here if set
+        self.translation_cache_entries = translation_cache_entries  # size of the translation memory, 0 disables it
 
     def __getitem__(self, item: str):
         if item == 'textdetector':
@@ -1,4 +1,4 @@
-from qtpy.QtWidgets import QGraphicsOpacityEffect, QFrame, QWidget, QComboBox, QLabel, QSizePolicy, QDialog, QProgressBar, QMessageBox, QVBoxLayout, QStyle, QSlider, QProxyStyle, QStyle, QStyleOptionSlider, QColorDialog, QPushButton
+from qtpy.QtWidgets import QGraphicsOpacityEffect, QFrame, QWidget, QComboBox, QLabel, QSizePolicy, QDialog, QProgressBar, QMessageBox, QVBoxLayout, QHBoxLayout, QStyle, QSlider, QProxyStyle, QStyle, QStyleOptionSlider, QColorDialog, QPushButton
 from qtpy.QtCore import Qt, QPropertyAnimation, QEasingCurve, QPointF, QRect, Signal
 from qtpy.QtGui import QFontMetrics, QMouseEvent, QShowEvent, QWheelEvent, QPainter, QFontMetrics, QColor
 from typing import List, Union, Tuple
@@ -114,6 +114,8 @@ class ProgressMessageBox(QDialog):
 
 
 class ImgtransProgressMessageBox(ProgressMessageBox):
+    pause_toggled = Signal(bool)
+    cancel_clicked = Signal()
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(None, *args, **kwargs)
         
@@ -122,11 +124,26 @@ class ImgtransProgressMessageBox(ProgressMessageBox):
         self.inpaint_bar = TaskProgressBar(self.tr('Inpainting: '), self)
         self.translate_bar = TaskProgressBar(self.tr('Translating: '), self)
 
+        self.pause_btn = QPushButton(self.tr('Pause'), self)
+        self.pause_btn.setCheckable(True)
+        self.pause_btn.toggled.connect(self.on_pause_toggled)
+        self.cancel_btn = QPushButton(self.tr('Cancel'), self)
+        self.cancel_btn.clicked.connect(lambda : self.cancel_clicked.emit())
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.pause_btn)
+        btn_layout.addWidget(self.cancel_btn)
+
         layout = self.layout()
         layout.addWidget(self.detect_bar)
         layout.addWidget(self.ocr_bar)
         layout.addWidget(self.inpaint_bar)
         layout.addWidget(self.translate_bar)
+        layout.addLayout(btn_layout)
+
+    def on_pause_toggled(self, paused: bool):
+        self.pause_btn.setText(self.tr('Resume') if paused else self.tr('Pause'))
+        self.pause_toggled.emit(paused)
 
     def updateDetectProgress(self, value: int, msg: str = ''):
         self.detect_bar.updateProgress(value, msg)
@@ -145,6 +162,10 @@ class ImgtransProgressMessageBox(ProgressMessageBox):
         self.updateOCRProgress(0)
         self.updateInpaintProgress(0)
         self.updateTranslateProgress(0)
+        self.pause_btn.blockSignals(True)
+        self.pause_btn.setChecked(False)
+        self.pause_btn.setText(self.tr('Pause'))
+        self.pause_btn.blockSignals(False)
 
     def show_all_bars(self):
         self.detect_bar.show()
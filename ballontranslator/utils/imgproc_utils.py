@@ -353,4 +353,14 @@ def square_pad_resize(img: np.ndarray, tgt_size: int):
     if down_scale_ratio < 1:
         img = cv2.resize(img, (tgt_size, tgt_size), interpolation=cv2.INTER_LINEAR)
 
-    return img, down_scale_ratio, pad_h, pad_w
\ No newline at end of file
+    return img, down_scale_ratio, pad_h, pad_w
+
+def dilate_mask(mask: np.ndarray, ksize: int) -> np.ndarray:
+    if ksize <= 0:
+        return mask
+    element = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * ksize + 1, 2 * ksize + 1),(ksize, ksize))
+    return cv2.dilate(mask, element)
+
+def psnr(img1: np.ndarray, img2: np.ndarray) -> float:
+    mse = np.mean((img1.astype(np.float64) - img2.astype(np.float64)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255 ** 2 / mse)
@@ -1,7 +1,10 @@
-import json, os, cv2
+import json, os, cv2, hashlib
 import os.path as osp
+import threading
 import numpy as np
 from pathlib import Path
+from collections import deque
+from typing import Dict
 
 IMG_EXT = ['.bmp', '.jpg', '.png', '.jpeg', '.webp']
 NP_BOOL_TYPES = (np.bool_, np.bool8)
@@ -46,6 +49,16 @@ def imread(imgpath, read_type=cv2.IMREAD_COLOR):
     img = cv2.imdecode(np.fromfile(imgpath, dtype=np.uint8), read_type)
     return img
 
+def file_hash(file_path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
 def imwrite(img_path, img, ext='.png'):
     suffix = Path(img_path).suffix
     if suffix != '':
@@ -54,6 +67,103 @@ def imwrite(img_path, img, ext='.png'):
         img_path += ext
     cv2.imencode(ext, img)[1].tofile(img_path)
 
+class AsyncImgWriter:
+    '''
+    Write-behind imwrite, images are encoded & written on a background thread in submission order.
+    Pending images are capped by max_bytes, write() blocks until there is room.
+    The first exception raised by a write is re-raised by following write(), wait() and flush() calls.
+    '''
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2, profiler = None) -> None:
+        self.max_bytes = max_bytes
+        self.profiler = profiler    # StageProfiler, records 'save' of writes tagged with a page
+        self.exception: BaseException = None
+        self._queue = deque()
+        self._pending: Dict[str, int] = {}
+        self._pending_bytes = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread: threading.Thread = None
+
+    def _raise_exception(self):
+        if self.exception is not None:
+            raise self.exception
+
+    def write(self, img_path: str, img: np.ndarray, ext: str = '.png', copy: bool = False, page: str = None):
+        '''
+        copy should be set if the caller may modify img before it gets written
+        '''
+        with self._cond:
+            self._raise_exception()
+            while self._pending_bytes > 0 and self._pending_bytes + img.nbytes > self.max_bytes and self.exception is None:
+                self._cond.wait()
+            self._raise_exception()
+            if copy:
+                img = img.copy()
+            self._queue.append((img_path, img, ext, page))
+            self._pending[img_path] = self._pending.get(img_path, 0) + 1
+            self._pending_bytes += img.nbytes
+            if self._thread is None:
+                self._closed = False
+                self._thread = threading.Thread(target=self._work, name='imwrite', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                img_path, img, ext, page = self._queue.popleft()
+            try:
+                if self.profiler is not None and page is not None:
+                    with self.profiler.profile(page, 'save'):
+                        imwrite(img_path, img, ext)
+                else:
+                    imwrite(img_path, img, ext)
+            except Exception as e:
+                with self._cond:
+                    if self.exception is None:
+                        self.exception = e
+            with self._cond:
+                self._pending[img_path] -= 1
+                if self._pending[img_path] == 0:
+                    self._pending.pop(img_path)
+                self._pending_bytes -= img.nbytes
+                self._cond.notify_all()
+
+    def is_pending(self, img_path: str = None) -> bool:
+        if img_path is None:
+            return self._pending_bytes > 0
+        return img_path in self._pending
+
+    def wait(self, img_path: str = None, raise_exception: bool = True):
+        '''
+        Block until pending writes of img_path, or all pending writes if img_path is None, are done.
+        '''
+        with self._cond:
+            while self.is_pending(img_path):
+                self._cond.wait()
+            if raise_exception:
+                self._raise_exception()
+
+    def flush(self):
+        self.wait()
+
+    def close(self):
+        '''
+        Finish pending writes and stop the writer thread, exceptions are not raised here.
+        '''
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
 def show_img_by_dict(imgdicts):
     for keyname in imgdicts.keys():
         cv2.imshow(keyname, imgdicts[keyname])
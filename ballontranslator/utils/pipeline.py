@@ -0,0 +1,343 @@
+import threading, time
+from queue import Queue
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Any
+
+_STOP = object()
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    '''
+    Cooperative cancellation & pausing, long running jobs call check() between pages and blocks,
+    which blocks while paused and raises PipelineCancelled once cancelled.
+    '''
+
+    def __init__(self) -> None:
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # wake up paused jobs so they can quit
+        self._running.set()
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def reset(self):
+        self._cancelled.clear()
+        self._running.set()
+
+    def check(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise PipelineCancelled
+
+    def sleep(self, seconds: float):
+        '''
+        sleep which returns early once cancelled
+        '''
+        self._cancelled.wait(seconds)
+
+
+class OrderedExecutor:
+    '''
+    Run calls on a thread pool with at most max_inflight of them in flight, 
+    results are handed to their callbacks on the submitting thread in submission order.
+    submit() blocks on the oldest call once max_inflight calls are pending, 
+    an exception raised by a call or its callback is re-raised by submit(), pop() or drain().
+    '''
+
+    def __init__(self, max_inflight: int = 1, thread_name_prefix: str = '') -> None:
+        self.max_inflight = max(1, max_inflight)
+        self.thread_name_prefix = thread_name_prefix
+        self._inflight = deque()
+        self._executor: ThreadPoolExecutor = None
+
+    def __enter__(self) -> 'OrderedExecutor':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def num_inflight(self) -> int:
+        return len(self._inflight)
+
+    def submit(self, func: Callable, *args, callback: Callable = None, **kwargs):
+        while len(self._inflight) >= self.max_inflight:
+            self.pop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_inflight, thread_name_prefix=self.thread_name_prefix)
+        self._inflight.append((self._executor.submit(func, *args, **kwargs), callback))
+
+    def pop(self):
+        '''
+        wait for the oldest call and run its callback
+        '''
+        future, callback = self._inflight.popleft()
+        rst = future.result()
+        if callback is not None:
+            callback(rst)
+
+    def drain(self):
+        while self._inflight:
+            self.pop()
+
+    def close(self):
+        '''
+        drop calls not started yet and wait for running ones, their callbacks are not run
+        '''
+        for future, _ in self._inflight:
+            future.cancel()
+        self._inflight.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class PipelineStage:
+
+    def __init__(self, name: str, func: Callable, maxsize: int = 2, on_finished: Callable = None, batch_fits: Callable = None, concurrency: int = 1) -> None:
+        self.name = name
+        self.func = func
+        self.queue = Queue(maxsize=maxsize)
+        self.downstream: List['PipelineStage'] = []
+        self.on_finished = on_finished
+        self.batch_fits = batch_fits
+        self.concurrency = max(1, concurrency)
+        self.counter = 0
+        self.thread: threading.Thread = None
+
+
+class StagedPipeline:
+    '''
+    Run stages on their own worker threads, items are handed over through bounded queues,
+    so wall clock approaches the slowest stage instead of the sum of all stages.
+    A stage can feed multiple downstream stages, items are processed in input order by every stage.
+    '''
+
+    def __init__(self, queue_size: int = 2, cancel_token: CancelToken = None) -> None:
+        self.queue_size = max(1, queue_size)
+        self.cancel_token = cancel_token
+        self.stages: Dict[str, PipelineStage] = {}
+        self.root_stages: List[PipelineStage] = []
+        self.exception: BaseException = None
+        self.failed_stage: str = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, func: Callable, upstream: str = None, on_finished: Callable = None, 
+                  batch_fits: Callable = None, concurrency: int = 1) -> PipelineStage:
+        '''
+        func receives an item and returns the item passed to downstream stages,
+        returning None passes the input item itself.
+        If batch_fits is given, items are buffered until batch_fits(items) returns False for the next one, 
+        func then receives the list of buffered items and returns a list of items (or None) instead.
+        concurrency > 1 keeps up to that many func calls in flight on a thread pool (e.g. network requests), 
+        on_finished and downstream stages still get items in input order.
+        '''
+        stage = PipelineStage(name, func, self.queue_size, on_finished, batch_fits, concurrency)
+        self.stages[name] = stage
+        if upstream is None:
+            self.root_stages.append(stage)
+        else:
+            self.stages[upstream].downstream.append(stage)
+        return stage
+
+    @property
+    def failed(self) -> bool:
+        return self.exception is not None
+
+    def _set_exception(self, stage: PipelineStage, e: BaseException):
+        with self._lock:
+            if self.exception is None:
+                self.exception = e
+                self.failed_stage = stage.name
+
+    def _call(self, stage: PipelineStage, items: List[Any]) -> List[Any]:
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+        if stage.batch_fits is None:
+            out = stage.func(items[0])
+            return [items[0] if out is None else out]
+        outs = stage.func(items)
+        return items if outs is None else outs
+
+    def _finish(self, stage: PipelineStage, outs: List[Any]):
+        for out in outs:
+            stage.counter += 1
+            if stage.on_finished is not None:
+                stage.on_finished(out)
+        for out in outs:
+            for ds in stage.downstream:
+                ds.queue.put(out)
+
+    def _process(self, stage: PipelineStage, items: List[Any], executor: OrderedExecutor = None):
+        try:
+            if executor is None:
+                self._finish(stage, self._call(stage, items))
+            else:
+                executor.submit(self._call, stage, items, callback=lambda outs: self._finish(stage, outs))
+        except BaseException as e:
+            self._set_exception(stage, e)
+
+    def _work(self, stage: PipelineStage):
+        executor = OrderedExecutor(stage.concurrency, f'pipeline-{stage.name}') if stage.concurrency > 1 else None
+        batch = []
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                break
+            if self.failed:
+                # keep draining so upstream stages never block on a full queue
+                continue
+            if stage.batch_fits is None:
+                self._process(stage, [item], executor)
+                continue
+            try:
+                full = len(batch) > 0 and not stage.batch_fits(batch + [item])
+            except BaseException as e:
+                self._set_exception(stage, e)
+                continue
+            if full:
+                self._process(stage, batch, executor)
+                batch = []
+            batch.append(item)
+        if batch and not self.failed:
+            self._process(stage, batch, executor)
+        if executor is not None:
+            try:
+                if not self.failed:
+                    executor.drain()
+            except BaseException as e:
+                self._set_exception(stage, e)
+            finally:
+                executor.close()
+        for ds in stage.downstream:
+            ds.queue.put(_STOP)
+
+    def run(self, items: Iterable[Any]):
+        '''
+        Feed items to root stages and block until every stage finished,
+        the first exception raised by a stage is re-raised here.
+        '''
+        for stage in self.stages.values():
+            stage.counter = 0
+            stage.thread = threading.Thread(target=self._work, args=(stage, ), name=f'pipeline-{stage.name}', daemon=True)
+            stage.thread.start()
+
+        try:
+            for item in items:
+                if self.failed:
+                    break
+                if self.cancel_token is not None:
+                    self.cancel_token.check()
+                for stage in self.root_stages:
+                    stage.queue.put(item)
+        except BaseException as e:
+            self._set_exception(self.root_stages[0], e)
+        finally:
+            for stage in self.root_stages:
+                stage.queue.put(_STOP)
+            for stage in self.stages.values():
+                stage.thread.join()
+
+        if self.exception is not None:
+            raise self.exception
+
+
+class Prefetcher:
+    '''
+    Load items ahead of the consumer on a thread pool (opencv decoding releases the GIL),
+    at most num_prefetch items are pending at the same time, and no more than max_bytes of loaded arrays are held.
+    Items should be requested in the order of keys, get() on an item not ready yet counts as a miss.
+    '''
+
+    def __init__(self, load_func: Callable, keys: Iterable[Any], num_prefetch: int = 2, max_bytes: int = 1 << 30, num_workers: int = None) -> None:
+        self.load_func = load_func
+        self.keys = list(keys)
+        self.num_prefetch = max(0, num_prefetch)
+        self.max_bytes = max_bytes
+        self.num_workers = num_workers if num_workers is not None else max(1, self.num_prefetch)
+        self.hits = 0
+        self.misses = 0
+        self.wait_time = 0.
+        self._next = 0
+        self._item_bytes = 0
+        self._futures: Dict[Any, Future] = {}
+        self._executor: ThreadPoolExecutor = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'Prefetcher':
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start(self):
+        if self.num_prefetch > 0:
+            self._executor = ThreadPoolExecutor(self.num_workers, thread_name_prefix='prefetch')
+        self._schedule()
+
+    def close(self):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _schedule(self):
+        if self._executor is None:
+            return
+        with self._lock:
+            while self._next < len(self.keys) and len(self._futures) < self.num_prefetch:
+                # size of an item is unknown before it's loaded, estimate it with the largest one seen
+                if self._futures and (len(self._futures) + 1) * self._item_bytes > self.max_bytes:
+                    break
+                key = self.keys[self._next]
+                self._next += 1
+                if key not in self._futures:
+                    self._futures[key] = self._executor.submit(self.load_func, key)
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            future = self._futures.pop(key, None)
+            if future is None and self._next < len(self.keys) and self.keys[self._next] == key:
+                self._next += 1
+        if future is not None and future.done():
+            self.hits += 1
+            item = future.result()
+        else:
+            self.misses += 1
+            t0 = time.perf_counter()
+            item = future.result() if future is not None else self.load_func(key)
+            self.wait_time += time.perf_counter() - t0
+        nbytes = getattr(item, 'nbytes', 0)
+        if nbytes > self._item_bytes:
+            self._item_bytes = nbytes
+        self._schedule()
+        return item
+
+    def summary(self) -> str:
+        return f'prefetch   {self.hits} hits, {self.misses} misses, waited {self.wait_time:.2f}s'
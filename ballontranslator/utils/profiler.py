@@ -0,0 +1,142 @@
+import time, json, csv, sys
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List
+
+try:
+    import resource
+except ImportError:     # windows
+    resource = None
+
+PROFILE_FIELDS = ['page', 'stage', 'start', 'wall', 'cpu', 'rss_delta_mb']
+
+
+def max_rss_mb() -> float:
+    '''
+    peak resident set size of this process, 0 if unavailable
+    '''
+    if resource is None:
+        return 0.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on linux
+    return rss / 1024 ** 2 if sys.platform == 'darwin' else rss / 1024
+
+
+class StageProfiler:
+    '''
+    Record wall time, cpu time of the calling thread and peak rss growth of every (page, stage).
+    Peak rss is process wide, growth is charged to the stage running when the peak was raised.
+    '''
+
+    def __init__(self) -> None:
+        self.records: List[Dict] = []
+        self.t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.records = []
+            self.t0 = time.perf_counter()
+
+    @contextmanager
+    def profile(self, page: str, stage: str):
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        rss = max_rss_mb()
+        try:
+            yield
+        finally:
+            self.add_record(page, stage, start - self.t0, time.perf_counter() - start, time.thread_time() - cpu, max_rss_mb() - rss)
+
+    def add_record(self, page: str, stage: str, start: float, wall: float, cpu: float, rss_delta_mb: float):
+        record = {'page': page, 'stage': stage, 'start': start, 'wall': wall, 'cpu': cpu, 'rss_delta_mb': rss_delta_mb}
+        with self._lock:
+            self.records.append(record)
+
+    def extend(self, records: List[Dict], start_offset: float = 0.):
+        '''
+        merge records of another profiler, e.g. one running in a worker process
+        '''
+        with self._lock:
+            for record in records:
+                self.records.append({**record, 'start': record['start'] + start_offset})
+
+    def stage_total(self, stage: str, key: str = 'wall') -> float:
+        with self._lock:
+            return sum(r[key] for r in self.records if r['stage'] == stage)
+
+    def summary(self) -> Dict[str, Dict]:
+        '''
+        per stage number of records, total & average wall/cpu time, max rss growth
+        '''
+        summary = {}
+        with self._lock:
+            records = list(self.records)
+        for r in records:
+            s = summary.setdefault(r['stage'], {'count': 0, 'wall': 0., 'cpu': 0., 'max_rss_delta_mb': 0.})
+            s['count'] += 1
+            s['wall'] += r['wall']
+            s['cpu'] += r['cpu']
+            s['max_rss_delta_mb'] = max(s['max_rss_delta_mb'], r['rss_delta_mb'])
+        for s in summary.values():
+            s['avg_wall'] = s['wall'] / s['count']
+            s['avg_cpu'] = s['cpu'] / s['count']
+        return summary
+
+    def dump_json(self, save_path: str):
+        with self._lock:
+            records = list(self.records)
+        with open(save_path, 'w', encoding='utf8') as f:
+            f.write(json.dumps({'summary': self.summary(), 'records': records}, ensure_ascii=False, indent=4))
+
+    def dump_csv(self, save_path: str):
+        with self._lock:
+            records = list(self.records)
+        with open(save_path, 'w', encoding='utf8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+
+
+class LatencyHistogram:
+    '''
+    Latencies counted in log-spaced buckets (10ms to ~9min by default), 
+    quantiles are reported as the upper bound of the bucket they fall in.
+    '''
+
+    def __init__(self, min_latency: float = 0.01, growth: float = 1.25, num_buckets: int = 50) -> None:
+        self.bounds = [min_latency * growth ** ii for ii in range(num_buckets)]
+        self.counts = [0] * (num_buckets + 1)
+        self.count = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def add(self, latency: float):
+        with self._lock:
+            self.counts[bisect_left(self.bounds, latency)] += 1
+            self.count += 1
+
+    def add_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def quantile(self, q: float) -> float:
+        '''
+        None if nothing was recorded
+        '''
+        with self._lock:
+            if self.count == 0:
+                return None
+            target = q * self.count
+            accumulated = 0
+            for ii, count in enumerate(self.counts):
+                accumulated += count
+                if accumulated >= target and count > 0:
+                    return self.bounds[ii] if ii < len(self.bounds) else float('inf')
+        return float('inf')
+
+    def summary(self) -> str:
+        if self.count == 0:
+            return f'0 requests, {self.failures} failed'
+        return f'{self.count} requests, {self.failures} failed, p50 {self.quantile(0.5):.2f}s p95 {self.quantile(0.95):.2f}s p99 {self.quantile(0.99):.2f}s'
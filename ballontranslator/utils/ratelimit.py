@@ -0,0 +1,164 @@
+import time, threading, random
+from email.utils import parsedate_to_datetime
+from typing import Callable
+
+
+class TokenBucket:
+    '''
+    rate tokens are added per second up to capacity, rate <= 0 means unlimited.
+    Tokens are reserved up front and the bucket can go into debt,
+    so a request larger than capacity waits in proportion to its size instead of never fitting.
+    '''
+
+    def __init__(self, rate: float, capacity: float = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.) -> float:
+        '''
+        take amount tokens, returns seconds to wait before they can be used
+        '''
+        if self.rate <= 0:
+            return 0.
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    '''
+    requests/sec & chars/sec budgets shared by every thread sending requests of a translator
+    '''
+
+    def __init__(self, requests_per_sec: float = 0., chars_per_sec: float = 0.) -> None:
+        self.request_bucket = TokenBucket(requests_per_sec)
+        self.char_bucket = TokenBucket(chars_per_sec)
+        self._blocked_until = 0.
+        self._lock = threading.Lock()
+
+    def acquire(self, num_chars: int = 0, sleep: Callable = time.sleep) -> float:
+        '''
+        block until a request of num_chars is allowed, returns seconds waited
+        '''
+        wait = max(self.request_bucket.reserve(1), self.char_bucket.reserve(num_chars))
+        with self._lock:
+            wait = max(wait, self._blocked_until - time.monotonic())
+        if wait > 0:
+            sleep(wait)
+            return wait
+        return 0.
+
+    def block(self, seconds: float):
+        '''
+        hold back every request for seconds, e.g. after the server answered 429 with Retry-After
+        '''
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+def backoff_delay(attempt: int, base: float = 1., max_delay: float = 60.) -> float:
+    '''
+    exponential backoff with full jitter
+    '''
+    return random.uniform(0, min(max_delay, base * 2 ** attempt))
+
+
+def parse_retry_after(value: str) -> float:
+    '''
+    seconds to wait from a Retry-After header, which is either seconds or a http date, None if missing or invalid
+    '''
+    if not value:
+        return None
+    try:
+        return max(0., float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0., parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class AIMDController:
+    '''
+    Adaptive limit of requests in flight: the window grows while requests succeed with healthy latency 
+    (by 1 per success until the first congestion, then by 1 per window of successes) 
+    and is cut by decrease on congestion (429, 5xx, timeouts), at most once per observed round trip.
+    '''
+
+    def __init__(self, max_window: int = 8, min_window: int = 1, decrease: float = 0.5, latency_tolerance: float = 3.) -> None:
+        self.max_window = max(1, max_window)
+        self.min_window = max(1, min(min_window, self.max_window))
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance  # latency above tolerance * baseline doesn't grow the window
+        self.window = float(self.min_window)
+        self.slow_start = True
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.completed = 0
+        self.congestions = 0
+        self.num_chars = 0
+        self.baseline_latency: float = None
+        self._last_decrease = 0.
+        self._t0: float = None
+        self._cond = threading.Condition()
+
+    def acquire(self, check: Callable = None):
+        '''
+        block until the window has room for another request, check() is called while waiting, e.g. to raise on cancel
+        '''
+        with self._cond:
+            while self.inflight >= int(self.window):
+                self._cond.wait(0.1)
+                if check is not None:
+                    check()
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
+            if self._t0 is None:
+                self._t0 = time.monotonic()
+
+    def release(self, latency: float, congested: bool = False, succeeded: bool = True, num_chars: int = 0):
+        with self._cond:
+            self.inflight -= 1
+            now = time.monotonic()
+            if congested:
+                self.congestions += 1
+                self.slow_start = False
+                # requests in flight when the window was cut are likely to fail as well
+                if now - self._last_decrease > (self.baseline_latency or latency):
+                    self.window = max(self.min_window, self.window * self.decrease)
+                    self._last_decrease = now
+            elif succeeded:
+                self.completed += 1
+                self.num_chars += num_chars
+                if self.baseline_latency is None or latency < self.baseline_latency:
+                    self.baseline_latency = latency
+                else:
+                    # let the baseline follow slow drifts
+                    self.baseline_latency = 0.95 * self.baseline_latency + 0.05 * latency
+                if latency <= self.latency_tolerance * self.baseline_latency:
+                    self.window = min(self.max_window, self.window + (1. if self.slow_start else 1. / self.window))
+            self._cond.notify_all()
+
+    def throughput(self) -> float:
+        '''
+        completed requests per second since the first request
+        '''
+        if self._t0 is None:
+            return 0.
+        elapsed = time.monotonic() - self._t0
+        return self.completed / elapsed if elapsed > 0 else 0.
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self._t0 if self._t0 is not None else 0.
+        chars_per_sec = self.num_chars / elapsed if elapsed > 0 else 0.
+        return f'window {self.window:.1f}/{self.max_window} (peak {self.peak_inflight} in flight), {self.completed} requests, ' \
+               f'{self.congestions} congested, {self.throughput():.2f} req/s, {chars_per_sec:.0f} chars/s'